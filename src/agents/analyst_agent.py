@@ -5,11 +5,21 @@ CodeAgent для SQL, и структурированный вывод чере
 """
 
 import asyncio
+import re
+from functools import cached_property
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Type
 from datetime import datetime
+import hashlib
+import threading
+import time
 import uuid
 
+import diskcache
+import httpx
+import orjson
+from pydantic import BaseModel, TypeAdapter, ValidationError as PydanticValidationError
+from litellm.llms.custom_httpx.http_handler import HTTPHandler
 from smolagents import (
     CodeAgent,
     ToolCallingAgent,
@@ -33,11 +43,131 @@ from ..models.kpi_models import (
 )
 from ..utils.logging_config import get_logger
 from ..utils.retry_handler import retry_with_backoff
+from ..utils.validators import InputValidator
 from ..core.config import settings
 from ..core.exceptions import ProcessingError
 
 logger = get_logger(__name__)
 
+# Паттерны дат: DD.MM.YYYY | YYYY-MM-DD (один проход по тексту)
+_DATE_RE = re.compile(r'(?P<dmy>\d{2}\.\d{2}\.\d{4})|(?P<ymd>\d{4}-\d{2}-\d{2})')
+_DATE_FORMATS = {
+    'dmy': '%d.%m.%Y',
+    'ymd': '%Y-%m-%d',
+}
+
+# Промпт извлечения KPI: статичные части собираются один раз при импорте,
+# в рантайме подставляются только данные документа
+_PROMPT_HEADER = """
+Ты - эксперт финансовый аналитик. Твоя задача - извлечь ключевые показатели (KPI) 
+из финансового отчета.
+
+**Тип отчета:** {report_type}
+
+**Текст документа (первые 3000 символов):**
+{text}
+
+**Доступные таблицы:**
+{tables}
+
+**Похожие отчеты из архива:**
+{similar}
+
+**Задача:**
+Извлеки следующие KPI и верни в JSON формате:
+
+"""
+
+_PROMPT_KPI_SCHEMAS = {
+    ReportType.BALANCE_SHEET: """
+{
+  "total_assets": {"value": число, "unit": "RUB", "period": "YYYY-MM-DD"},
+  "total_liabilities": {...},
+  "equity": {...},
+  "current_assets": {...},
+  "current_liabilities": {...}
+}
+
+**Инструкции:**
+1. Используй инструмент `parse_pdf_document` если нужно
+2. Используй `search_similar_reports` для проверки
+3. Используй `calculate_financial_metric` для коэффициентов
+4. Если данных нет - укажи null
+5. Добавь confidence score для каждой метрики (0.0-1.0)
+""",
+    ReportType.INCOME_STATEMENT: """
+{
+  "revenue": {"value": число, "unit": "RUB", "period": "YYYY-MM-DD"},
+  "gross_profit": {...},
+  "operating_income": {...},
+  "net_income": {...}
+}
+
+**Инструкции:**
+1. Найди строки "Выручка", "Валовая прибыль", "Операционная прибыль", "Чистая прибыль"
+2. Используй `calculate_financial_metric` для рентабельности
+3. Проверь через `search_similar_reports`
+""",
+}
+
+_PROMPT_FOOTER = "\n\n**Важно:** Верни только JSON, без дополнительных пояснений."
+
+_PROMPT_SUFFIXES = {
+    report_type: _PROMPT_KPI_SCHEMAS.get(report_type, "") + _PROMPT_FOOTER
+    for report_type in ReportType
+}
+
+# Валидатор словаря метрик (строится один раз, переиспользуется)
+_METRIC_DICT_ADAPTER = TypeAdapter(Dict[str, FinancialMetric])
+
+# Схема KPI для каждого типа отчета
+_KPI_MODELS: Dict[ReportType, Type[BaseModel]] = {
+    ReportType.BALANCE_SHEET: BalanceSheetKPI,
+    ReportType.INCOME_STATEMENT: IncomeStatementKPI,
+}
+
+# Структурные символы JSON для поиска границ объекта
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+
+def _find_json(text: str) -> Optional[str]:
+    """
+    Поиск первого JSON-объекта в тексте по балансу скобок
+    
+    Скобки внутри строковых литералов (с учетом экранирования)
+    не учитываются.
+    
+    Returns:
+        Подстрока с объектом или None, если объект не найден
+    """
+    start = text.find('{')
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    pos = start
+    
+    while match := _JSON_TOKEN_RE.search(text, pos):
+        char = match.group()
+        pos = match.end()
+        
+        if in_string:
+            if char == '\\':
+                pos += 1  # Пропуск экранированного символа
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:pos]
+    
+    return None
+
 
 class FinancialAnalystAgent:
     """
@@ -57,42 +187,89 @@ class FinancialAnalystAgent:
     """
     
     def __init__(self):
-        """Инициализация агента и всех компонентов"""
+        """
+        Инициализация агента
+        
+        Тяжелые компоненты (парсеры, Vision, FAISS + embedding модель,
+        агенты) создаются лениво при первом обращении.
+        """
         logger.info("Initializing FinancialAnalystAgent")
         
+        # Общий пул keep-alive соединений для всех вызовов LLM
+        self._http_client = httpx.Client(
+            timeout=60,
+            limits=httpx.Limits(
+                max_keepalive_connections=32,
+                max_connections=64
+            )
+        )
+        
         # LLM модель (через LiteLLM для унификации)
         self.llm = LiteLLMModel(
             model_id=settings.LLM_MODEL,
             api_key=settings.ANTHROPIC_API_KEY,
             temperature=0.1,  # Низкая для точности
         )
+        # kwargs модели уходят в litellm.completion (имя `client`
+        # в конструкторе занято самим модулем litellm)
+        self.llm.kwargs['client'] = HTTPHandler(client=self._http_client)
         
-        # Tools
-        self.pdf_parser = PDFParser()
-        self.excel_parser = ExcelParser()
-        self.vision_analyzer = VisionAnalyzer()
-        self.calculator = FinancialCalculator()
-        self.faiss_engine = FAISSSearchEngine(
-            index_path=settings.FAISS_INDEX_PATH
+        logger.info("✅ FinancialAnalystAgent initialized")
+    
+    # Tools
+    @cached_property
+    def pdf_parser(self) -> PDFParser:
+        return PDFParser()
+    
+    @cached_property
+    def excel_parser(self) -> ExcelParser:
+        return ExcelParser()
+    
+    @cached_property
+    def vision_analyzer(self) -> VisionAnalyzer:
+        return VisionAnalyzer()
+    
+    @cached_property
+    def calculator(self) -> FinancialCalculator:
+        return FinancialCalculator()
+    
+    @cached_property
+    def faiss_engine(self) -> FAISSSearchEngine:
+        # Read-only индекс; для IVF (ivfpq) inverted lists через mmap -
+        # страницы общие для всех uvicorn workers
+        return FAISSSearchEngine(
+            index_path=settings.FAISS_INDEX_PATH,
+            mmap=True,
+            quantize=settings.EMBEDDING_QUANTIZE
         )
-        
-        # CodeAgent для SQL генерации
-        self.code_agent = CodeAgent(
+    
+    @cached_property
+    def parse_cache(self) -> diskcache.Cache:
+        """Дисковый кэш результатов парсинга (общий для worker-процессов)"""
+        return diskcache.Cache(
+            str(settings.PARSE_CACHE_DIR),
+            size_limit=settings.PARSE_CACHE_SIZE_LIMIT
+        )
+    
+    @cached_property
+    def code_agent(self) -> CodeAgent:
+        """CodeAgent для SQL генерации"""
+        return CodeAgent(
             tools=[],
             model=self.llm,
             max_steps=5,
             verbosity_level=1 if settings.DEBUG else 0
         )
-        
-        # Main ToolCallingAgent
-        self.agent = ToolCallingAgent(
+    
+    @cached_property
+    def agent(self) -> ToolCallingAgent:
+        """Main ToolCallingAgent"""
+        return ToolCallingAgent(
             tools=self._build_tools(),
             model=self.llm,
             max_steps=10,
             verbosity_level=1 if settings.DEBUG else 0
         )
-        
-        logger.info("✅ FinancialAnalystAgent initialized")
     
     def _build_tools(self) -> List:
         """Построение списка tools для агента"""
@@ -147,6 +324,8 @@ class FinancialAnalystAgent:
             Returns:
                 Dict с типом графика, значениями и трендами
             """
+            # single-call guarantee: graceful degradation внутри VisionAnalyzer,
+            # VisionAPIError возможен только при отключенном fallback
             try:
                 chart_analysis = await self.vision_analyzer.analyze_chart(
                     Path(image_path),
@@ -156,13 +335,8 @@ class FinancialAnalystAgent:
                 return chart_analysis.model_dump()
                 
             except VisionAPIError as e:
-                logger.warning(f"Vision API error, using fallback: {e}")
-                # Graceful degradation уже в VisionAnalyzer
-                fallback = await self.vision_analyzer.analyze_chart(
-                    Path(image_path),
-                    context=context
-                )
-                return fallback.model_dump()
+                logger.error(f"Vision API error, fallback disabled: {e}")
+                raise ProcessingError(f"Chart analysis error: {e}")
         
         @tool
         def search_similar_reports(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
@@ -241,7 +415,6 @@ class FinancialAnalystAgent:
                 sql_query = self.code_agent.run(prompt)
                 
                 # Санитизация для защиты от injection
-                from ..utils.validators import InputValidator
                 safe_sql = InputValidator.sanitize_sql_input(sql_query)
                 
                 logger.info(f"Generated SQL for {kpi_description}")
@@ -290,23 +463,28 @@ class FinancialAnalystAgent:
             }
         )
         
-        start_time = datetime.now()
+        started_ns = time.perf_counter_ns()
         report_id = f"report_{uuid.uuid4().hex[:8]}"
         
         try:
             # 1. Парсинг документа
             parsed_data = await self._parse_document(file_path)
             
-            # 2. Семантический поиск похожих отчетов
-            similar_reports = await self._find_similar_reports(
-                parsed_data['text'],
-                company_name
+            # 2-3. Семантический поиск похожих отчетов и анализ графиков
+            # независимы друг от друга - выполняем параллельно
+            similar_reports, charts_analysis = await asyncio.gather(
+                self._find_similar_reports(parsed_data['text'], company_name),
+                self._analyze_charts(parsed_data.get('images', [])),
+                return_exceptions=True
             )
             
-            # 3. Анализ графиков (если есть)
-            charts_analysis = await self._analyze_charts(
-                parsed_data.get('images', [])
-            )
+            # Graceful degradation: сбой одной из веток не роняет анализ
+            if isinstance(similar_reports, Exception):
+                logger.warning(f"Similar reports search failed: {similar_reports}")
+                similar_reports = []
+            if isinstance(charts_analysis, Exception):
+                logger.warning(f"Charts analysis failed: {charts_analysis}")
+                charts_analysis = []
             
             # 4. Извлечение KPI через агента
             kpi_data = await self._extract_kpi(
@@ -323,7 +501,7 @@ class FinancialAnalystAgent:
                 parsed_data=parsed_data,
                 kpi_data=kpi_data,
                 charts_analysis=charts_analysis,
-                processing_time=(datetime.now() - start_time).total_seconds()
+                processing_time=(time.perf_counter_ns() - started_ns) / 1e9
             )
             
             logger.info(
@@ -344,13 +522,47 @@ class FinancialAnalystAgent:
             raise ProcessingError(f"Document analysis failed: {e}")
     
     async def _parse_document(self, file_path: Path) -> Dict[str, Any]:
-        """Парсинг PDF или Excel"""
-        if file_path.suffix.lower() == '.pdf':
-            return self.pdf_parser.parse(file_path)
-        elif file_path.suffix.lower() in ['.xlsx', '.xls']:
-            return self.excel_parser.parse(file_path)
+        """Парсинг PDF или Excel (в thread pool, не блокируя event loop)"""
+        suffix = file_path.suffix.lower()
+        
+        if suffix == '.pdf':
+            def parse(path: Path, digest: str) -> Dict[str, Any]:
+                return self.pdf_parser.parse(path, content_digest=digest)
+        elif suffix in ['.xlsx', '.xls']:
+            def parse(path: Path, digest: str) -> Dict[str, Any]:
+                return self.excel_parser.parse(path)
         else:
             raise ProcessingError(f"Unsupported file type: {file_path.suffix}")
+        
+        return await asyncio.to_thread(self._parse_cached, parse, file_path)
+    
+    def _parse_cached(
+        self,
+        parse: Callable[[Path, str], Dict[str, Any]],
+        file_path: Path
+    ) -> Dict[str, Any]:
+        """Парсинг с кэшем по хэшу содержимого (повторные загрузки не парсятся)"""
+        with open(file_path, 'rb') as f:
+            digest = hashlib.file_digest(
+                f,
+                lambda: hashlib.blake2b(digest_size=16)
+            ).hexdigest()
+        key = f"{file_path.suffix.lower()}:{digest}"
+        
+        parsed_data = self.parse_cache.get(key)
+        if parsed_data is not None:
+            # Изображения лежат во временной папке и могли быть удалены
+            # (перезапуск, очистка /tmp): тогда документ парсится заново
+            if all(Path(img).exists() for img in parsed_data.get('images', ())):
+                logger.info(f"Parse cache hit for {file_path.name}")
+                return parsed_data
+            logger.info(
+                f"Parse cache entry for {file_path.name} has missing images, re-parsing"
+            )
+        
+        parsed_data = parse(file_path, digest)
+        self.parse_cache.set(key, parsed_data)
+        return parsed_data
     
     async def _find_similar_reports(
         self,
@@ -360,22 +572,41 @@ class FinancialAnalystAgent:
         """Поиск похожих отчетов в FAISS"""
         try:
             query = f"{company_name} {text[:500]}" if company_name else text[:500]
-            return self.faiss_engine.search(query, top_k=3)
+            # Нормализация, чтобы мелкие вариации попадали в кэш embeddings
+            query = " ".join(query.split()).lower()
+            # Encode + поиск CPU-bound: в thread pool, чтобы не блокировать loop.
+            # faiss_engine ленивый (первое обращение грузит модель и индекс),
+            # поэтому и само обращение к нему выполняется в потоке
+            return await asyncio.to_thread(
+                lambda: self.faiss_engine.search(query, top_k=3)
+            )
         except Exception as e:
             logger.warning(f"FAISS search failed: {e}")
             return []  # Graceful degradation
     
     async def _analyze_charts(self, images: List[Path]) -> List[ChartAnalysis]:
-        """Анализ всех графиков в документе"""
-        charts = []
+        """Анализ всех графиков в документе (параллельно, с лимитом)"""
+        if not images:
+            return []
         
-        for img_path in images:
-            try:
-                chart = await self.vision_analyzer.analyze_chart(img_path)
-                charts.append(chart)
-            except Exception as e:
-                logger.warning(f"Chart analysis failed for {img_path}: {e}")
+        semaphore = asyncio.Semaphore(settings.VISION_MAX_CONCURRENCY)
+        
+        async def analyze_one(img_path: Path) -> ChartAnalysis:
+            async with semaphore:
+                return await self.vision_analyzer.analyze_chart(img_path)
+        
+        results = await asyncio.gather(
+            *(analyze_one(img_path) for img_path in images),
+            return_exceptions=True
+        )
+        
+        charts = []
+        for img_path, result in zip(images, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Chart analysis failed for {img_path}: {result}")
                 # Продолжаем с другими графиками
+                continue
+            charts.append(result)
         
         return charts
     
@@ -422,63 +653,12 @@ class FinancialAnalystAgent:
         similar_reports: List[Dict]
     ) -> str:
         """Построение промпта для агента"""
-        
-        base_prompt = f"""
-Ты - эксперт финансовый аналитик. Твоя задача - извлечь ключевые показатели (KPI) 
-из финансового отчета.
-
-**Тип отчета:** {report_type.value}
-
-**Текст документа (первые 3000 символов):**
-{parsed_data['text'][:3000]}
-
-**Доступные таблицы:**
-{parsed_data.get('tables', [])}
-
-**Похожие отчеты из архива:**
-{similar_reports[:2] if similar_reports else 'Нет'}
-
-**Задача:**
-Извлеки следующие KPI и верни в JSON формате:
-
-"""
-        
-        if report_type == ReportType.BALANCE_SHEET:
-            base_prompt += """
-{
-  "total_assets": {"value": число, "unit": "RUB", "period": "YYYY-MM-DD"},
-  "total_liabilities": {...},
-  "equity": {...},
-  "current_assets": {...},
-  "current_liabilities": {...}
-}
-
-**Инструкции:**
-1. Используй инструмент `parse_pdf_document` если нужно
-2. Используй `search_similar_reports` для проверки
-3. Используй `calculate_financial_metric` для коэффициентов
-4. Если данных нет - укажи null
-5. Добавь confidence score для каждой метрики (0.0-1.0)
-"""
-        
-        elif report_type == ReportType.INCOME_STATEMENT:
-            base_prompt += """
-{
-  "revenue": {"value": число, "unit": "RUB", "period": "YYYY-MM-DD"},
-  "gross_profit": {...},
-  "operating_income": {...},
-  "net_income": {...}
-}
-
-**Инструкции:**
-1. Найди строки "Выручка", "Валовая прибыль", "Операционная прибыль", "Чистая прибыль"
-2. Используй `calculate_financial_metric` для рентабельности
-3. Проверь через `search_similar_reports`
-"""
-        
-        base_prompt += "\n\n**Важно:** Верни только JSON, без дополнительных пояснений."
-        
-        return base_prompt
+        return _PROMPT_HEADER.format(
+            report_type=report_type.value,
+            text=parsed_data['text'][:3000],
+            tables=parsed_data.get('tables', []),
+            similar=similar_reports[:2] if similar_reports else 'Нет'
+        ) + _PROMPT_SUFFIXES[report_type]
     
     def _parse_agent_response(
         self,
@@ -486,24 +666,17 @@ class FinancialAnalystAgent:
         report_type: ReportType
     ) -> Dict[str, Any]:
         """Парсинг ответа агента в structured format"""
-        import json
-        import re
-        
         try:
             # Извлечение JSON из ответа
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                data = json.loads(json_str)
+            json_str = _find_json(response)
+            if json_str:
+                data = orjson.loads(json_str)
                 
-                # Валидация через Pydantic
-                if report_type == ReportType.BALANCE_SHEET:
-                    # Преобразование в BalanceSheetKPI
-                    validated = self._validate_balance_sheet(data)
-                elif report_type == ReportType.INCOME_STATEMENT:
-                    validated = self._validate_income_statement(data)
-                else:
-                    validated = data
+                # Валидация через Pydantic по схеме типа отчета
+                model_cls = _KPI_MODELS.get(report_type)
+                validated = (
+                    self._validate_kpi(data, model_cls) if model_cls else data
+                )
                 
                 return validated
             else:
@@ -513,24 +686,20 @@ class FinancialAnalystAgent:
             logger.error(f"Failed to parse agent response: {e}")
             raise ProcessingError(f"Response parsing error: {e}")
     
-    def _validate_balance_sheet(self, data: Dict) -> Dict:
-        """Валидация данных баланса через Pydantic"""
+    def _validate_kpi(self, data: Dict, model_cls: Type[BaseModel]) -> Dict:
+        """Валидация KPI-метрик по полям схемы отчета через Pydantic"""
         try:
-            # Преобразование в Pydantic модели
-            metrics = {}
-            for key, value in data.items():
-                if value and isinstance(value, dict):
-                    metrics[key] = FinancialMetric(**value)
-            
-            return metrics
-        except Exception as e:
+            # Преобразование в Pydantic модели одним вызовом pydantic-core
+            return _METRIC_DICT_ADAPTER.validate_python({
+                key: value
+                for key, value in data.items()
+                if key in model_cls.model_fields
+                and value and isinstance(value, dict)
+            })
+        except PydanticValidationError as e:
             logger.warning(f"Validation failed: {e}, using raw data")
             return data
     
-    def _validate_income_statement(self, data: Dict) -> Dict:
-        """Валидация данных о прибылях"""
-        return self._validate_balance_sheet(data)  # Same structure
-    
     def _build_result(
         self,
         report_id: str,
@@ -586,26 +755,44 @@ class FinancialAnalystAgent:
         )
     
     def _extract_report_date(self, text: str) -> Optional[datetime.date]:
-        """Извлечение даты отчета из текста"""
-        import re
-        from datetime import datetime
-        
-        # Паттерны дат
-        patterns = [
-            r'(\d{2}\.\d{2}\.\d{4})',  # DD.MM.YYYY
-            r'(\d{4}-\d{2}-\d{2})',     # YYYY-MM-DD
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text[:1000])
-            if match:
-                try:
-                    date_str = match.group(1)
-                    if '.' in date_str:
-                        return datetime.strptime(date_str, '%d.%m.%Y').date()
-                    else:
-                        return datetime.strptime(date_str, '%Y-%m-%d').date()
-                except:
-                    continue
+        """Извлечение даты отчета из текста (первые 1000 символов)"""
+        for match in _DATE_RE.finditer(text, 0, 1000):
+            try:
+                return datetime.strptime(
+                    match.group(),
+                    _DATE_FORMATS[match.lastgroup]
+                ).date()
+            except ValueError:
+                continue
         
         return None
+
+
+_AGENT: Optional[FinancialAnalystAgent] = None
+_AGENT_LOCK = threading.Lock()
+
+
+def get_agent() -> FinancialAnalystAgent:
+    """Process-wide singleton агента (создается при первом запросе)"""
+    global _AGENT
+    if _AGENT is None:
+        with _AGENT_LOCK:
+            if _AGENT is None:
+                _AGENT = FinancialAnalystAgent()
+    return _AGENT
+
+
+def shutdown_agent() -> None:
+    """Сохранение состояния агента при остановке (если он был создан)"""
+    if _AGENT is None:
+        return
+    
+    # Не трогаем FAISS, если он так и не был загружен
+    if 'faiss_engine' in _AGENT.__dict__:
+        _AGENT.faiss_engine.save_embedding_cache()
+        _AGENT.faiss_engine.close()
+    
+    if 'parse_cache' in _AGENT.__dict__:
+        _AGENT.parse_cache.close()
+    
+    _AGENT._http_client.close()
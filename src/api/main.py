@@ -2,12 +2,17 @@ from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
-import time
+import aiofiles
+import tempfile
 from pathlib import Path
 from typing import Optional
 
 from ..models.kpi_models import AnalysisResult, ReportType
-from ..agents.analyst_agent import FinancialAnalystAgent
+from ..agents.analyst_agent import (
+    FinancialAnalystAgent,
+    get_agent,
+    shutdown_agent
+)
 from ..utils.logging_config import get_logger, setup_logging
 from ..utils.validators import InputValidator
 from ..core.config import settings
@@ -17,6 +22,8 @@ from ..core.exceptions import ValidationError, ProcessingError
 setup_logging()
 logger = get_logger(__name__)
 
+UPLOAD_CHUNK_SIZE = 64 * 1024  # 64KB
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -25,8 +32,7 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting FinTech Analyst Agent API")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
     
-    # Initialize agent
-    app.state.agent = FinancialAnalystAgent()
+    # Агент создается лениво при первом запросе (см. get_agent)
     
     # Health check
     logger.info("✅ API ready")
@@ -35,6 +41,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("👋 Shutting down API")
+    shutdown_agent()
 
 
 app = FastAPI(
@@ -83,7 +90,8 @@ async def health_check():
 async def analyze_report(
     file: UploadFile = File(...),
     report_type: ReportType = ReportType.BALANCE_SHEET,
-    company_name: Optional[str] = None
+    company_name: Optional[str] = None,
+    agent: FinancialAnalystAgent = Depends(get_agent)
 ):
     """
     Анализ финансового отчета
@@ -99,39 +107,54 @@ async def analyze_report(
     Raises:
         HTTPException: При ошибках валидации или обработки
     """
-    start_time = time.time()
-    
     try:
-        # Валидация файла
-        temp_path = Path(f"/tmp/{file.filename}")
-        
-        with open(temp_path, 'wb') as f:
-            content = await file.read()
-            f.write(content)
-        
-        InputValidator.validate_file_upload(temp_path)
+        # Размер известен после multipart-парсинга: отсекаем до записи на диск
+        if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+            raise ValidationError(
+                f"File too large: {file.size} bytes. "
+                f"Max: {settings.MAX_UPLOAD_SIZE} bytes"
+            )
         
-        # Валидация company name
-        if company_name:
-            company_name = InputValidator.validate_company_name(company_name)
-        
-        # Анализ через агента
-        agent: FinancialAnalystAgent = app.state.agent
-        result = await agent.analyze_document(
-            file_path=temp_path,
-            report_type=report_type,
-            company_name=company_name
-        )
-        
-        # Добавление processing time
-        result.processing_time = time.time() - start_time
+        # Уникальный временный файл (на tmpfs, если доступен), удаляется
+        # автоматически при выходе из блока; расширение сохраняем - по нему
+        # работают валидация и выбор парсера
+        with tempfile.NamedTemporaryFile(
+            suffix=Path(file.filename or "").suffix,
+            dir=settings.UPLOAD_TMP_DIR
+        ) as tmp:
+            temp_path = Path(tmp.name)
+            
+            # Потоковая запись на диск чанками (весь файл в памяти не держим)
+            file_size = 0
+            async with aiofiles.open(temp_path, 'wb') as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    file_size += len(chunk)
+                    if file_size > settings.MAX_UPLOAD_SIZE:
+                        raise ValidationError(
+                            f"File too large: more than {settings.MAX_UPLOAD_SIZE} bytes"
+                        )
+                    await f.write(chunk)
+            
+            # Валидация файла
+            InputValidator.validate_file_upload(temp_path)
+            
+            # Валидация company name
+            if company_name:
+                company_name = InputValidator.validate_company_name(company_name)
+            
+            # Анализ через агента
+            result = await agent.analyze_document(
+                file_path=temp_path,
+                report_type=report_type,
+                company_name=company_name
+            )
         
         logger.info(
             f"Analysis completed in {result.processing_time:.2f}s",
             extra={
                 "report_id": result.report_id,
                 "report_type": report_type,
-                "file_size": len(content)
+                "file_size": file_size
             }
         )
         
@@ -148,11 +171,6 @@ async def analyze_report(
     except Exception as e:
         logger.error(f"Unexpected error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
-        
-    finally:
-        # Cleanup
-        if temp_path.exists():
-            temp_path.unlink()
 
 
 # Error handlers
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
-from typing import List
+from typing import List, Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -28,14 +28,37 @@ class Settings(BaseSettings):
     # Vision API
     VISION_FALLBACK_ENABLED: bool = True
     VISION_MAX_RETRIES: int = 3
+    VISION_MAX_CONCURRENCY: int = 8  # Параллельных запросов к Vision API
     
     # FAISS
     FAISS_INDEX_PATH: Path = Path("data/embeddings")
     EMBEDDING_MODEL: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+    EMBEDDING_QUANTIZE: bool = False  # fp16 на CUDA, dynamic int8 на CPU
+    FAISS_INDEX_TYPE: Literal["flat", "hnsw", "ivfpq", "sq_fp16", "sq8"] = "flat"
+    FAISS_HNSW_M: int = 32  # HNSW: связей на вершину графа
+    FAISS_HNSW_EF_CONSTRUCTION: int = 200
+    FAISS_HNSW_EF_SEARCH: int = 64
+    FAISS_IVF_TRAIN_SIZE: int = 10000  # IVFPQ: векторов до обучения (до этого - flat)
+    FAISS_SQ_TRAIN_SIZE: int = 1000  # SQ8: векторов до обучения (до этого - flat)
+    FAISS_FLUSH_EVERY: int = 10  # add_documents между записями индекса на диск
+    FAISS_NLIST: int = 1024  # IVF: число кластеров
+    FAISS_NPROBE: int = 16  # IVF: кластеров на запрос
+    FAISS_PQ_M: int = 16  # PQ: число субквантизаторов (делитель размерности)
+    FAISS_PQ_NBITS: int = 8  # PQ: бит на код
+    
+    # Кэш результатов парсинга (по хэшу содержимого файла)
+    PARSE_CACHE_DIR: Path = Path("data/parse_cache")
+    PARSE_CACHE_SIZE_LIMIT: int = 2 * 1024 ** 3  # 2GB
+    
+    # Извлечение таблиц из PDF в отдельных процессах (pdfplumber держит GIL)
+    PDF_TABLE_WORKERS: int = 4
+    PDF_TABLE_PARALLEL_MIN_PAGES: int = 8  # Меньше страниц - в текущем процессе
     
     # File Upload
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: List[str] = [".pdf", ".xlsx", ".xls"]
+    # Временные файлы загрузок: tmpfs, если доступен (None -> системный tmp)
+    UPLOAD_TMP_DIR: Optional[Path] = Path("/dev/shm") if Path("/dev/shm").is_dir() else None
     
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
@@ -0,0 +1,53 @@
+from typing import Sequence
+
+import numpy as np
+from numba import float64, njit, prange, void
+
+from .kpi_models import BalanceSheetKPI
+
+# Столбцы результата balance_sheet_ratios (как ключи BalanceSheetKPI.ratios)
+RATIO_NAMES = ("current_ratio", "debt_to_equity", "equity_ratio")
+
+_BALANCE_SIG = void(
+    float64[::1], float64[::1], float64[::1], float64[::1], float64[::1],
+    float64[:, ::1]
+)
+
+
+@njit([_BALANCE_SIG], parallel=True, cache=True)
+def _balance_ratios_kernel(assets, liabilities, equity, cur_assets, cur_liabilities, out):
+    # Неположительный знаменатель (или nan - нет метрики) -> nan
+    for i in prange(assets.shape[0]):
+        out[i, 0] = (
+            cur_assets[i] / cur_liabilities[i]
+            if cur_liabilities[i] > 0 else np.nan
+        )
+        out[i, 1] = liabilities[i] / equity[i] if equity[i] > 0 else np.nan
+        out[i, 2] = equity[i] / assets[i] if assets[i] > 0 else np.nan
+
+
+def balance_sheet_ratios(kpis: Sequence[BalanceSheetKPI]) -> np.ndarray:
+    """
+    Коэффициенты баланса для батча отчетов одним Numba-ядром
+
+    Для одного отчета быстрее BalanceSheetKPI.ratios(): вызов ядра
+    окупается только на батчах.
+
+    Returns:
+        Массив (len(kpis), 3), столбцы - RATIO_NAMES; nan, если
+        коэффициент не определен
+    """
+    n = len(kpis)
+    values = np.full((5, n), np.nan)
+
+    for i, kpi in enumerate(kpis):
+        values[0, i] = kpi.total_assets.value_f
+        values[1, i] = kpi.total_liabilities.value_f
+        values[2, i] = kpi.equity.value_f
+        if kpi.current_assets and kpi.current_liabilities:
+            values[3, i] = kpi.current_assets.value_f
+            values[4, i] = kpi.current_liabilities.value_f
+
+    out = np.empty((n, len(RATIO_NAMES)))
+    _balance_ratios_kernel(*values, out)
+    return out
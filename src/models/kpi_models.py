@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from functools import cached_property
 from typing import Optional, List, Dict
 from datetime import date
 from decimal import Decimal
@@ -14,6 +15,9 @@ class ReportType(str, Enum):
 
 class FinancialMetric(BaseModel):
     """Базовая финансовая метрика"""
+    # frozen: value не меняется, поэтому value_f можно кэшировать
+    model_config = ConfigDict(frozen=True)
+    
     name: str = Field(..., description="Название метрики")
     value: Decimal = Field(..., description="Значение")
     unit: str = Field(default="RUB", description="Единица измерения")
@@ -26,6 +30,11 @@ class FinancialMetric(BaseModel):
         if v < 0:
             raise ValueError("Метрика не может быть отрицательной")
         return v
+    
+    @cached_property
+    def value_f(self) -> float:
+        """Значение как float для расчета коэффициентов (не сериализуется)"""
+        return float(self.value)
 
 
 class BalanceSheetKPI(BaseModel):
@@ -40,9 +49,25 @@ class BalanceSheetKPI(BaseModel):
     def current_ratio(self) -> Optional[float]:
         """Коэффициент текущей ликвидности"""
         if self.current_assets and self.current_liabilities:
-            if self.current_liabilities.value > 0:
-                return float(self.current_assets.value / self.current_liabilities.value)
+            if self.current_liabilities.value_f > 0:
+                return self.current_assets.value_f / self.current_liabilities.value_f
         return None
+    
+    def ratios(self) -> Dict[str, Optional[float]]:
+        """
+        Коэффициенты баланса во float (Decimal остается для отображения)
+        
+        Батч отчетов: _kpi_fastpath.balance_sheet_ratios
+        """
+        assets = self.total_assets.value_f
+        equity = self.equity.value_f
+        return {
+            'current_ratio': self.current_ratio,
+            'debt_to_equity': (
+                self.total_liabilities.value_f / equity if equity > 0 else None
+            ),
+            'equity_ratio': equity / assets if assets > 0 else None,
+        }
 
 
 class IncomeStatementKPI(BaseModel):
@@ -55,8 +80,8 @@ class IncomeStatementKPI(BaseModel):
     @property
     def profit_margin(self) -> float:
         """Рентабельность"""
-        if self.revenue.value > 0:
-            return float(self.net_income.value / self.revenue.value)
+        if self.revenue.value_f > 0:
+            return self.net_income.value_f / self.revenue.value_f
         return 0.0
 
 
@@ -0,0 +1,21 @@
+from numba import float64, njit, prange, void
+
+# Numba-ядра батч-режима FinancialCalculator (импортируется лениво из
+# calculator._kernels): деление и масштаб за один проход без временных
+# массивов NumPy. error_model='numpy' - деление на 0 дает inf/nan, как в
+# NumPy, а не ZeroDivisionError. fastmath не включается: он разрешает
+# компилятору считать, что inf/nan не возникают.
+_RATIO_SIG = void(float64[::1], float64[::1], float64, float64[::1])
+_DIFF_RATIO_SIG = void(float64[::1], float64[::1], float64[::1], float64[::1])
+
+
+@njit([_RATIO_SIG], parallel=True, cache=True, error_model='numpy')
+def ratio_kernel(num, den, scale, out):
+    for i in prange(num.shape[0]):
+        out[i] = num[i] / den[i] * scale
+
+
+@njit([_DIFF_RATIO_SIG], parallel=True, cache=True, error_model='numpy')
+def diff_ratio_kernel(minuend, subtrahend, den, out):
+    for i in prange(minuend.shape[0]):
+        out[i] = (minuend[i] - subtrahend[i]) / den[i]
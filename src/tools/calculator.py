@@ -1,10 +1,84 @@
-from typing import Dict
+from typing import Callable, Dict, List
 import math
 
+import numpy as np
+
 from ..utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+ArrayDict = Dict[str, np.ndarray]
+
+
+def _kernels():
+    """
+    Numba-ядра батч-режима (см. _calc_kernels)
+    
+    numba импортируется и ядра загружаются при первом calculate_batch,
+    а не при импорте модуля (импорт numba занимает больше секунды).
+    """
+    from . import _calc_kernels
+    return _calc_kernels
+
+
+def _contiguous(*arrays: np.ndarray) -> List[np.ndarray]:
+    """Приведение к общей форме и плоским непрерывным float64 массивам"""
+    return [
+        np.ascontiguousarray(array, dtype=np.float64).reshape(-1)
+        for array in np.broadcast_arrays(*arrays)
+    ]
+
+
+def _ratio(num: np.ndarray, den: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    shape = np.broadcast_shapes(num.shape, den.shape)
+    num, den = _contiguous(num, den)
+    out = np.empty_like(num)
+    _kernels().ratio_kernel(num, den, scale, out)
+    return out.reshape(shape)
+
+
+# Векторные формулы: одно ядро на весь батч периодов/компаний
+def _current_ratio_vec(v: ArrayDict) -> np.ndarray:
+    return _ratio(v['current_assets'], v['current_liabilities'])
+
+
+def _quick_ratio_vec(v: ArrayDict) -> np.ndarray:
+    shape = np.broadcast_shapes(
+        v['current_assets'].shape,
+        v['inventory'].shape,
+        v['current_liabilities'].shape
+    )
+    current_assets, inventory, current_liabilities = _contiguous(
+        v['current_assets'], v['inventory'], v['current_liabilities']
+    )
+    out = np.empty_like(current_assets)
+    _kernels().diff_ratio_kernel(current_assets, inventory, current_liabilities, out)
+    return out.reshape(shape)
+
+
+def _roe_vec(v: ArrayDict) -> np.ndarray:
+    return _ratio(v['net_income'], v['equity'], 100.0)
+
+
+def _roa_vec(v: ArrayDict) -> np.ndarray:
+    return _ratio(v['net_income'], v['total_assets'], 100.0)
+
+
+def _debt_to_equity_vec(v: ArrayDict) -> np.ndarray:
+    return _ratio(v['total_debt'], v['equity'])
+
+
+def _profit_margin_vec(v: ArrayDict) -> np.ndarray:
+    return _ratio(v['net_income'], v['revenue'], 100.0)
+
+
+def _gross_margin_vec(v: ArrayDict) -> np.ndarray:
+    return _ratio(v['gross_profit'], v['revenue'], 100.0)
+
+
+def _operating_margin_vec(v: ArrayDict) -> np.ndarray:
+    return _ratio(v['operating_income'], v['revenue'], 100.0)
+
 
 class FinancialCalculator:
     """
@@ -19,17 +93,6 @@ class FinancialCalculator:
     - Profit margin
     """
     
-    SUPPORTED_METRICS = {
-        'current_ratio',
-        'quick_ratio',
-        'roe',
-        'roa',
-        'debt_to_equity',
-        'profit_margin',
-        'gross_margin',
-        'operating_margin'
-    }
-    
     def calculate(self, metric_name: str, values: Dict[str, float]) -> float:
         """
         Расчет финансовой метрики
@@ -44,37 +107,58 @@ class FinancialCalculator:
         Raises:
             ValueError: Если метрика не поддерживается или недостаточно данных
         """
-        metric_name = metric_name.lower()
+        # Проверка поддержки и выбор формулы - один lookup в словаре
+        fn = self._DISPATCH.get(metric_name.lower())
         
-        if metric_name not in self.SUPPORTED_METRICS:
+        if fn is None:
             raise ValueError(
-                f"Unsupported metric: {metric_name}. "
-                f"Supported: {self.SUPPORTED_METRICS}"
+                f"Unsupported metric: {metric_name.lower()}. "
+                f"Supported: {', '.join(sorted(self.SUPPORTED_METRICS))}"
             )
         
         try:
-            if metric_name == 'current_ratio':
-                return self._current_ratio(values)
-            elif metric_name == 'quick_ratio':
-                return self._quick_ratio(values)
-            elif metric_name == 'roe':
-                return self._roe(values)
-            elif metric_name == 'roa':
-                return self._roa(values)
-            elif metric_name == 'debt_to_equity':
-                return self._debt_to_equity(values)
-            elif metric_name == 'profit_margin':
-                return self._profit_margin(values)
-            elif metric_name == 'gross_margin':
-                return self._gross_margin(values)
-            elif metric_name == 'operating_margin':
-                return self._operating_margin(values)
+            return fn(self, values)
         
         except KeyError as e:
             raise ValueError(f"Missing required value: {e}")
         except ZeroDivisionError:
             raise ValueError("Division by zero in calculation")
     
+    def calculate_batch(self, metric_name: str, arrays: ArrayDict) -> np.ndarray:
+        """
+        Расчет финансовой метрики для батча значений
+        
+        Args:
+            metric_name: Название метрики
+            arrays: Dict с массивами одной формы (по периодам/компаниям)
+        
+        Returns:
+            float64 массив значений; при нулевом знаменателе - inf/nan
+            в соответствующих позициях (батч не прерывается)
+        
+        Raises:
+            ValueError: Если метрика не поддерживается, недостаточно данных
+                или формы массивов несовместимы
+        """
+        fn = self._BATCH_DISPATCH.get(metric_name.lower())
+        
+        if fn is None:
+            raise ValueError(
+                f"Unsupported metric: {metric_name.lower()}. "
+                f"Supported: {', '.join(sorted(self.SUPPORTED_METRICS))}"
+            )
+        
+        values = {
+            key: np.asarray(array, dtype=np.float64)
+            for key, array in arrays.items()
+        }
+        
+        try:
+            return fn(values)
+        
+        except KeyError as e:
+            raise ValueError(f"Missing required value: {e}")
+    
     def _current_ratio(self, values: Dict) -> float:
         """Коэффициент текущей ликвидности"""
         return values['current_assets'] / values['current_liabilities']
@@ -109,3 +193,29 @@ class FinancialCalculator:
     def _operating_margin(self, values: Dict) -> float:
         """Операционная рентабельность"""
         return values['operating_income'] / values['revenue'] * 100
+    
+    # Метрика -> формула (несвязанные функции, вызываются как fn(self, values))
+    _DISPATCH: Dict[str, Callable[["FinancialCalculator", Dict], float]] = {
+        'current_ratio': _current_ratio,
+        'quick_ratio': _quick_ratio,
+        'roe': _roe,
+        'roa': _roa,
+        'debt_to_equity': _debt_to_equity,
+        'profit_margin': _profit_margin,
+        'gross_margin': _gross_margin,
+        'operating_margin': _operating_margin,
+    }
+    
+    # Та же таблица для векторных формул calculate_batch
+    _BATCH_DISPATCH: Dict[str, Callable[[ArrayDict], np.ndarray]] = {
+        'current_ratio': _current_ratio_vec,
+        'quick_ratio': _quick_ratio_vec,
+        'roe': _roe_vec,
+        'roa': _roa_vec,
+        'debt_to_equity': _debt_to_equity_vec,
+        'profit_margin': _profit_margin_vec,
+        'gross_margin': _gross_margin_vec,
+        'operating_margin': _operating_margin_vec,
+    }
+    
+    SUPPORTED_METRICS = frozenset(_DISPATCH)
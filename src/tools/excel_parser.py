@@ -1,6 +1,7 @@
 import openpyxl
+from openpyxl.reader.excel import ExcelReader
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from ..utils.logging_config import get_logger
 
@@ -18,15 +19,30 @@ class ExcelParser:
     - Metadata
     """
     
-    def parse(self, excel_path: Path) -> Dict[str, Any]:
+    def parse(
+        self,
+        excel_path: Path,
+        *,
+        extract_formulas: bool = False,
+        load_sheets: Optional[List[str]] = None,
+        load_metadata_only: bool = False
+    ) -> Dict[str, Any]:
         """
         Парсинг Excel файла
         
+        По умолчанию книга читается потоково (read_only) и листы
+        содержат вычисленные значения ячеек. С extract_formulas=True
+        листы содержат тексты формул и заполняется result['formulas'].
+        
         Args:
             excel_path: Путь к Excel
+            extract_formulas: Извлекать формулы вместо значений
+            load_sheets: Имена листов для парсинга (None - все листы)
+            load_metadata_only: Только свойства книги и имена листов,
+                без чтения shared strings и листов
         
         Returns:
-            Dict со всеми листами и данными
+            Dict со всеми листами и данными (строки листов - tuple)
         """
         logger.info(f"Parsing Excel: {excel_path}")
         
@@ -38,36 +54,61 @@ class ExcelParser:
         }
         
         try:
-            wb = openpyxl.load_workbook(excel_path, data_only=False)
+            if load_metadata_only:
+                result['metadata'] = self._read_metadata(excel_path)
+                return result
             
-            result['metadata'] = {
-                'creator': wb.properties.creator,
-                'created': str(wb.properties.created),
-                'modified': str(wb.properties.modified),
-                'num_sheets': len(wb.sheetnames)
-            }
+            # read_only: потоковый разбор XML без построения DOM всей книги
+            wb = openpyxl.load_workbook(
+                excel_path,
+                read_only=True,
+                data_only=not extract_formulas,
+                keep_links=False
+            )
             
-            # Парсинг каждого листа
-            for sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
-                
-                # Извлечение данных
-                sheet_data = []
-                for row in sheet.iter_rows(values_only=True):
-                    sheet_data.append(list(row))
-                
-                result['sheets'][sheet_name] = sheet_data
+            try:
+                result['metadata'] = {
+                    'creator': wb.properties.creator,
+                    'created': str(wb.properties.created),
+                    'modified': str(wb.properties.modified),
+                    'num_sheets': len(wb.sheetnames),
+                    'sheet_names': wb.sheetnames
+                }
                 
-                # Извлечение формул
-                for row in sheet.iter_rows():
-                    for cell in row:
-                        if cell.value and isinstance(cell.value, str):
-                            if cell.value.startswith('='):
+                # Парсинг каждого (запрошенного) листа
+                for sheet_name in load_sheets or wb.sheetnames:
+                    if sheet_name not in wb.sheetnames:
+                        logger.warning(f"Sheet not found: {sheet_name}")
+                        continue
+                    
+                    sheet = wb[sheet_name]
+                    
+                    if not extract_formulas:
+                        # Извлечение данных (строки - tuple из openpyxl, без копии)
+                        result['sheets'][sheet_name] = list(
+                            sheet.iter_rows(values_only=True)
+                        )
+                        continue
+                    
+                    # Данные и формулы за один проход по листу
+                    sheet_data = []
+                    for row in sheet.iter_rows():
+                        row_values = []
+                        for cell in row:
+                            value = cell.value
+                            row_values.append(value)
+                            if isinstance(value, str) and value.startswith('='):
                                 result['formulas'].append({
                                     'sheet': sheet_name,
                                     'cell': cell.coordinate,
-                                    'formula': cell.value
+                                    'formula': value
                                 })
+                        sheet_data.append(tuple(row_values))
+                    
+                    result['sheets'][sheet_name] = sheet_data
+            finally:
+                # read_only книга держит zip-архив открытым до close()
+                wb.close()
             
             logger.info(
                 f"✅ Excel parsed: {len(result['sheets'])} sheets, "
@@ -79,3 +120,30 @@ class ExcelParser:
             raise
         
         return result
+    
+    def _read_metadata(self, excel_path: Path) -> Dict[str, Any]:
+        """
+        Свойства книги и имена листов без загрузки workbook
+        
+        load_workbook (и в read_only режиме) сначала читает всю таблицу
+        shared strings; здесь читаются только workbook.xml и core.xml.
+        """
+        reader = ExcelReader(excel_path, read_only=True, keep_links=False)
+        
+        try:
+            reader.read_manifest()
+            reader.read_workbook()
+            reader.read_properties()
+            
+            properties = reader.wb.properties
+            sheet_names = [sheet.name for sheet, _ in reader.parser.find_sheets()]
+        finally:
+            reader.archive.close()
+        
+        return {
+            'creator': properties.creator,
+            'created': str(properties.created),
+            'modified': str(properties.modified),
+            'num_sheets': len(sheet_names),
+            'sheet_names': sheet_names
+        }
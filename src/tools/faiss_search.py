@@ -1,15 +1,89 @@
 import faiss
 import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
+from collections import OrderedDict
+import atexit
+import hashlib
 import pickle
+import orjson
+import sqlite3
+import threading
+import torch
+from torch.ao.quantization import quantize_dynamic
 from sentence_transformers import SentenceTransformer
 
 from ..utils.logging_config import get_logger
 from ..core.config import settings
+from ..core.exceptions import FAISSError
 
 logger = get_logger(__name__)
 
+INDEX_FILE = "faiss_index.bin"
+METADATA_DB_FILE = "metadata.db"
+LEGACY_METADATA_FILE = "metadata.pkl"
+EMBEDDING_CACHE_FILE = "embed_cache.npz"
+
+# FAISS_INDEX_TYPE -> тип кодов IndexScalarQuantizer
+_SQ_TYPES = {
+    "sq_fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+# Метаданные в SQLite хранятся как JSON (orjson)
+_METADATA_JSON_OPTS = orjson.OPT_NON_STR_KEYS
+
+
+def _encode_record(record: Dict[str, Any]) -> bytes:
+    """Сериализация записи метаданных (date/datetime -> ISO строка)"""
+    return orjson.dumps(record, default=str, option=_METADATA_JSON_OPTS)
+
+
+# Загруженные encoder'ы: (имя модели, quantize) -> модель
+_MODEL_CACHE: Dict[Tuple[str, bool], SentenceTransformer] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def _encoder_precision(quantize: bool) -> str:
+    """Точность encoder: fp32, либо fp16 на CUDA / dynamic int8 на CPU"""
+    if not quantize:
+        return "fp32"
+    return "fp16" if torch.cuda.is_available() else "int8"
+
+
+def _load_embedding_model(name: str, quantize: bool) -> SentenceTransformer:
+    """
+    Загрузка SentenceTransformer с кэшем на процесс
+    
+    Повторные FAISSSearchEngine(...) с той же моделью переиспользуют
+    уже загруженные веса. Квантованная модель кэшируется отдельно,
+    т.к. half() меняет модель на месте.
+    """
+    key = (name, quantize)
+    
+    with _MODEL_CACHE_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is not None:
+            return model
+        
+        logger.info(f"Loading embedding model: {name}")
+        model = SentenceTransformer(name)
+        
+        # Квантование: вдвое-вчетверо меньше байт на веса Linear слоев
+        precision = _encoder_precision(quantize)
+        if precision == "fp16":
+            model.half()
+        elif precision == "int8":
+            model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        if quantize:
+            logger.info(f"Embedding model quantized to {precision}")
+        
+        # Режим инференса (dropout выключен)
+        model.eval()
+        
+        _MODEL_CACHE[key] = model
+        return model
+
 
 class FAISSSearchEngine:
     """
@@ -20,57 +94,203 @@ class FAISSSearchEngine:
     - SentenceTransformer embeddings (multilingual)
     - Metadata хранение для результатов
     - Batch indexing для масштабируемости
+    - LRU-кэш embeddings запросов (персистится в embed_cache.npz)
     """
     
     def __init__(
         self,
         index_path: Path,
-        embedding_model: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+        embedding_model: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
+        embedding_cache_size: int = 1024,
+        mmap: bool = False,
+        quantize: bool = False
     ):
         """
         Args:
             index_path: Путь к FAISS индексу
             embedding_model: Модель для embeddings
+            embedding_cache_size: Максимум закэшированных embeddings запросов
+            mmap: Открыть индекс read-only (add_documents недоступен);
+                для IVF (FAISS_INDEX_TYPE=ivfpq) inverted lists отображаются
+                через mmap и страницы общие для worker-процессов, остальные
+                типы индекса читаются в память каждого процесса
+            quantize: Квантовать encoder (fp16 на CUDA, dynamic int8 на CPU)
         """
         self.index_path = Path(index_path)
         self.embedding_model_name = embedding_model
+        self.mmap = mmap
         
-        # Инициализация embedding модели
-        logger.info(f"Loading embedding model: {embedding_model}")
-        self.embedding_model = SentenceTransformer(embedding_model)
+        # Инициализация embedding модели (одна на процесс для каждой модели)
+        self.embedding_precision = _encoder_precision(quantize)
+        self.embedding_model = _load_embedding_model(embedding_model, quantize)
         self.embedding_dim = self.embedding_model.get_sentence_embedding_dimension()
         
+        # Метаданные в SQLite: add_documents дописывает только новые строки
+        self._db = None if mmap else self._open_metadata_db()
+        
         # Загрузка или создание индекса
         self.index, self.metadata = self._load_or_create_index()
         
+        # Индекс пишется на диск раз в FAISS_FLUSH_EVERY вызовов add_documents
+        # и при завершении процесса
+        self._dirty_since_save = 0
+        if not mmap:
+            atexit.register(self.flush)
+        
+        # Кэш embeddings запросов: blake2b(query) -> vector
+        self.embedding_cache_size = embedding_cache_size
+        self._embedding_cache = self._load_embedding_cache()
+        self._embedding_cache_lock = threading.Lock()
+        
         logger.info(
             f"FAISS index ready: {self.index.ntotal} documents indexed"
         )
     
+    @property
+    def _embedding_cache_tag(self) -> str:
+        """Идентификатор encoder для кэша embeddings (модель + точность)"""
+        if self.embedding_precision == "fp32":
+            return self.embedding_model_name
+        return f"{self.embedding_model_name}@{self.embedding_precision}"
+    
     def _load_or_create_index(self):
         """Загрузка существующего индекса или создание нового"""
-        index_file = self.index_path / "faiss_index.bin"
-        metadata_file = self.index_path / "metadata.pkl"
+        index_file = self.index_path / INDEX_FILE
         
-        if index_file.exists() and metadata_file.exists():
+        if index_file.exists():
             # Загрузка существующего
             logger.info("Loading existing FAISS index")
-            index = faiss.read_index(str(index_file))
+            # IO_FLAG_MMAP отображает только inverted lists IVF индексов;
+            # flat/HNSW/SQ все равно читаются целиком в память процесса
+            io_flags = 0
+            if self.mmap and settings.FAISS_INDEX_TYPE == "ivfpq":
+                io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            index = faiss.read_index(str(index_file), io_flags)
             
-            with open(metadata_file, 'rb') as f:
-                metadata = pickle.load(f)
+            # Пустой необученный SQ8 (сохранен до обучения): заново как flat
+            if not index.is_trained and index.ntotal == 0:
+                index = self._create_index()
+            
+            # IVF: сколько кластеров просматривать на запрос
+            ivf = faiss.try_extract_index_ivf(index)
+            if ivf is not None:
+                ivf.nprobe = settings.FAISS_NPROBE
             
-            return index, metadata
+            # HNSW: ширина поиска по графу
+            if isinstance(index, faiss.IndexHNSW):
+                index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
         else:
             # Создание нового
             logger.info("Creating new FAISS index")
-            self.index_path.mkdir(parents=True, exist_ok=True)
-            
-            # IndexFlatIP для cosine similarity
-            index = faiss.IndexFlatIP(self.embedding_dim)
-            metadata = []
-            
-            return index, metadata
+            index = self._create_index()
+        
+        return index, self._load_metadata(index.ntotal)
+    
+    def _open_metadata_db(self) -> sqlite3.Connection:
+        """Открытие (создание) SQLite базы метаданных"""
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        
+        db = sqlite3.connect(
+            self.index_path / METADATA_DB_FILE,
+            check_same_thread=False
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS metadata "
+            "(id INTEGER PRIMARY KEY, data BLOB NOT NULL)"
+        )
+        db.commit()
+        return db
+    
+    def _load_metadata(self, ntotal: int) -> List[Dict[str, Any]]:
+        """
+        Загрузка метаданных (id строки = позиция вектора в индексе)
+        
+        Строки сверх ntotal (дописаны после последнего flush индекса)
+        отбрасываются, чтобы позиции совпадали с сохраненным индексом.
+        """
+        db_file = self.index_path / METADATA_DB_FILE
+        legacy_file = self.index_path / LEGACY_METADATA_FILE
+        
+        if self._db is None and not db_file.exists():
+            # Read-only без SQLite базы: старый формат или пустой индекс
+            if not legacy_file.exists():
+                return []
+            with open(legacy_file, 'rb') as f:
+                return pickle.load(f)[:ntotal]
+        
+        # as_uri() экранирует '?', '#' и '%' в пути
+        db = self._db or sqlite3.connect(
+            db_file.resolve().as_uri() + "?mode=ro", uri=True
+        )
+        try:
+            metadata = [
+                orjson.loads(data)
+                for (data,) in db.execute("SELECT data FROM metadata ORDER BY id")
+            ]
+        finally:
+            if db is not self._db:
+                db.close()
+        
+        # Миграция metadata.pkl в SQLite
+        if not metadata and self._db is not None and legacy_file.exists():
+            with open(legacy_file, 'rb') as f:
+                metadata = pickle.load(f)
+            self._append_metadata(0, metadata)
+            logger.info(f"Migrated {len(metadata)} metadata records to SQLite")
+        
+        if len(metadata) > ntotal:
+            logger.warning(
+                f"Dropping {len(metadata) - ntotal} metadata records "
+                f"not covered by the saved index"
+            )
+            del metadata[ntotal:]
+            if self._db is not None:
+                self._db.execute("DELETE FROM metadata WHERE id >= ?", (ntotal,))
+                self._db.commit()
+        
+        return metadata
+    
+    def _append_metadata(self, start: int, records: List[Dict[str, Any]]):
+        """Дописывание метаданных в SQLite (O(размер батча), JSON)"""
+        self._db.executemany(
+            "INSERT INTO metadata (id, data) VALUES (?, ?)",
+            (
+                (start + offset, _encode_record(record))
+                for offset, record in enumerate(records)
+            )
+        )
+        self._db.commit()
+    
+    def _create_index(self):
+        """
+        Создание пустого индекса по settings.FAISS_INDEX_TYPE
+        
+        Тип сохраняется в самом faiss_index.bin, поэтому read_index
+        восстанавливает его без дополнительных метаданных. Для ivfpq
+        и sq8 создается flat индекс: он накапливает векторы и
+        перестраивается, когда их достаточно для обучения (см. add_documents).
+        """
+        # Inner product = cosine similarity на нормализованных векторах
+        if settings.FAISS_INDEX_TYPE == "hnsw":
+            index = faiss.IndexHNSWFlat(
+                self.embedding_dim,
+                settings.FAISS_HNSW_M,
+                faiss.METRIC_INNER_PRODUCT
+            )
+            index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+            index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+            return index
+        
+        # fp16 коды не требуют обучения; sq8 (как и ivfpq) начинается с
+        # flat индекса и строится по накопленным векторам (build_sq_index)
+        if settings.FAISS_INDEX_TYPE == "sq_fp16":
+            return faiss.IndexScalarQuantizer(
+                self.embedding_dim,
+                _SQ_TYPES["sq_fp16"],
+                faiss.METRIC_INNER_PRODUCT
+            )
+        
+        return faiss.IndexFlatIP(self.embedding_dim)
     
     def add_documents(
         self,
@@ -92,99 +312,360 @@ class FAISSSearchEngine:
         if not documents:
             return 0
         
+        if self.mmap:
+            raise FAISSError("Index is opened read-only (mmap), indexing is disabled")
+        
         logger.info(f"Indexing {len(documents)} documents...")
         
         # Извлечение текстов
         texts = [doc['text'] for doc in documents]
         
-        # Генерация embeddings батчами
-        all_embeddings = []
+        # Генерация embeddings батчами прямо в непрерывный float32 буфер
+        embeddings_np = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
         for i in range(0, len(texts), batch_size):
             batch_texts = texts[i:i + batch_size]
-            embeddings = self.embedding_model.encode(
+            embeddings_np[i:i + len(batch_texts)] = self.embedding_model.encode(
                 batch_texts,
-                show_progress_bar=True,
-                normalize_embeddings=True  # Для cosine similarity
+                batch_size=batch_size,
+                show_progress_bar=False,
+                normalize_embeddings=True,  # Для cosine similarity
+                convert_to_numpy=True
             )
-            all_embeddings.extend(embeddings)
-        
-        # Конвертация в numpy
-        embeddings_np = np.array(all_embeddings).astype('float32')
         
         # Добавление в FAISS
         self.index.add(embeddings_np)
         
         # Сохранение метаданных
-        for doc in documents:
-            self.metadata.append(doc.get('metadata', {}))
+        start = len(self.metadata)
+        self.metadata.extend(doc.get('metadata') or {} for doc in documents)
+        self._append_metadata(start, self.metadata[start:])
+        self._dirty_since_save += 1
         
-        # Сохранение индекса
-        self._save_index()
+        # IVFPQ / SQ8: обучение, как только накоплено достаточно векторов
+        if (
+            settings.FAISS_INDEX_TYPE == "ivfpq"
+            and isinstance(self.index, faiss.IndexFlat)
+            and self.index.ntotal >= settings.FAISS_IVF_TRAIN_SIZE
+        ):
+            self.build_ivfpq_index()  # сохраняет индекс
+        elif (
+            settings.FAISS_INDEX_TYPE == "sq8"
+            and isinstance(self.index, faiss.IndexFlat)
+            and self.index.ntotal >= settings.FAISS_SQ_TRAIN_SIZE
+        ):
+            self.build_sq_index()  # сохраняет индекс
+        elif self._dirty_since_save >= settings.FAISS_FLUSH_EVERY:
+            self._save_index()
         
         logger.info(f"✅ Indexed {len(documents)} documents")
         return len(documents)
     
+    def build_ivfpq_index(self) -> int:
+        """
+        Перестроение индекса в IndexIVFPQ (сжатие PQ-кодами)
+        
+        Векторы из текущего flat индекса кластеризуются (IVF) и
+        квантуются (PQ), что сокращает объем данных на запрос.
+        Число кластеров ограничивается размером индекса (~39 точек
+        на кластер для обучения).
+        
+        Returns:
+            Количество векторов в новом индексе
+        
+        Raises:
+            FAISSError: Если индекс read-only, не flat или слишком мал
+        """
+        if self.mmap:
+            raise FAISSError("Index is opened read-only (mmap), rebuild is disabled")
+        
+        if not isinstance(self.index, faiss.IndexFlat):
+            raise FAISSError(f"Cannot rebuild {type(self.index).__name__} as IVFPQ")
+        
+        ntotal = self.index.ntotal
+        if ntotal < 2 ** settings.FAISS_PQ_NBITS:
+            raise FAISSError(
+                f"Not enough vectors to train IVFPQ: {ntotal} "
+                f"(need at least {2 ** settings.FAISS_PQ_NBITS})"
+            )
+        
+        vectors = self.index.reconstruct_n(0, ntotal)
+        nlist = max(1, min(settings.FAISS_NLIST, ntotal // 39))
+        
+        logger.info(f"Building IVFPQ index: {ntotal} vectors, nlist={nlist}")
+        
+        # Inner product, как и у flat индекса (cosine на нормализованных)
+        quantizer = faiss.IndexFlatIP(self.embedding_dim)
+        index = faiss.IndexIVFPQ(
+            quantizer,
+            self.embedding_dim,
+            nlist,
+            settings.FAISS_PQ_M,
+            settings.FAISS_PQ_NBITS,
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        index.add(vectors)
+        index.nprobe = min(settings.FAISS_NPROBE, nlist)
+        
+        self.index = index
+        self._save_index()
+        
+        logger.info(f"✅ IVFPQ index built: {index.ntotal} vectors")
+        return index.ntotal
+    
+    def build_sq_index(self) -> int:
+        """
+        Перестроение flat индекса в IndexScalarQuantizer (uint8 коды)
+        
+        SQ8 оценивает диапазон значений каждой координаты при обучении,
+        поэтому обучается сразу на всех накопленных векторах: на паре
+        векторов диапазоны вырождаются и все коды становятся почти равны.
+        
+        Returns:
+            Количество векторов в новом индексе
+        
+        Raises:
+            FAISSError: Если индекс read-only или не flat
+        """
+        if self.mmap:
+            raise FAISSError("Index is opened read-only (mmap), rebuild is disabled")
+        
+        if not isinstance(self.index, faiss.IndexFlat):
+            raise FAISSError(f"Cannot rebuild {type(self.index).__name__} as SQ8")
+        
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        
+        logger.info(f"Building SQ8 index: {len(vectors)} vectors")
+        
+        index = faiss.IndexScalarQuantizer(
+            self.embedding_dim,
+            _SQ_TYPES["sq8"],
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        index.add(vectors)
+        
+        self.index = index
+        self._save_index()
+        
+        logger.info(f"✅ SQ8 index built: {index.ntotal} vectors")
+        return index.ntotal
+    
     def search(
         self,
-        query: str,
+        query: Union[str, List[str]],
         top_k: int = 5,
         min_similarity: float = 0.5
-    ) -> List[Dict[str, Any]]:
+    ) -> Union[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
         """
         Семантический поиск похожих документов
         
         Args:
-            query: Текстовый запрос
+            query: Текстовый запрос или список запросов
             top_k: Количество результатов
             min_similarity: Минимальный порог similarity (0.0-1.0)
         
         Returns:
-            List результатов с метаданными и scores
+            List результатов с метаданными и scores; для списка
+            запросов - List таких списков (см. search_batch)
         """
+        if isinstance(query, str):
+            return self.search_batch([query], top_k, min_similarity)[0]
+        
+        return self.search_batch(query, top_k, min_similarity)
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        min_similarity: float = 0.5
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Семантический поиск для батча запросов
+        
+        Все запросы кодируются одним вызовом encode и ищутся одним
+        вызовом index.search.
+        
+        Args:
+            queries: Текстовые запросы
+            top_k: Количество результатов на запрос
+            min_similarity: Минимальный порог similarity (0.0-1.0)
+        
+        Returns:
+            List результатов для каждого запроса (в порядке queries)
+        """
+        if not queries:
+            return []
+        
         if self.index.ntotal == 0:
             logger.warning("FAISS index is empty")
-            return []
+            return [[] for _ in queries]
         
-        # Генерация embedding для запроса
-        query_embedding = self.embedding_model.encode(
-            [query],
-            normalize_embeddings=True
-        ).astype('float32')
+        # Embeddings запросов (из кэша, если уже считали)
+        query_embeddings = self._encode_queries(queries)
         
         # Поиск в FAISS
-        scores, indices = self.index.search(query_embedding, top_k)
+        scores, indices = self.index.search(query_embeddings, top_k)
+        
+        # Отсечение по порогу и по индексам без метаданных (-1 у FAISS)
+        mask = (
+            (scores >= min_similarity)
+            & (indices >= 0)
+            & (indices < len(self.metadata))
+        )
         
         # Формирование результатов
         results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if score < min_similarity:
-                continue
-            
-            if 0 <= idx < len(self.metadata):
-                result = {
-                    'score': float(score),
-                    'metadata': self.metadata[idx],
-                    'index': int(idx)
+        for row in range(len(queries)):
+            hits = np.flatnonzero(mask[row])
+            results.append([
+                {
+                    'score': float(scores[row, col]),
+                    'metadata': self.metadata[indices[row, col]],
+                    'index': int(indices[row, col])
                 }
-                results.append(result)
+                for col in hits
+            ])
         
-        logger.info(f"Found {len(results)} results for query: '{query[:50]}...'")
+        for query, query_results in zip(queries, results):
+            # Аргументы форматируются только если DEBUG включен
+            logger.debug(
+                "Found {} results for query: '{:.50}...'",
+                len(query_results),
+                query
+            )
         return results
     
-    def _save_index(self):
-        """Сохранение индекса и метаданных"""
-        index_file = self.index_path / "faiss_index.bin"
-        metadata_file = self.index_path / "metadata.pkl"
+    @staticmethod
+    def _query_key(query: str) -> bytes:
+        """Ключ кэша embeddings: 128-битный blake2b от текста запроса"""
+        return hashlib.blake2b(query.encode('utf-8'), digest_size=16).digest()
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embeddings запросов с LRU-кэшем
+        
+        Закэшированные векторы берутся из кэша, остальные запросы
+        кодируются одним батчем (без forward pass на каждый запрос).
+        """
+        keys = [self._query_key(query) for query in queries]
+        embeddings = np.empty((len(queries), self.embedding_dim), dtype=np.float32)
+        missing = []
         
-        faiss.write_index(self.index, str(index_file))
+        with self._embedding_cache_lock:
+            for row, key in enumerate(keys):
+                cached = self._embedding_cache.get(key)
+                if cached is None:
+                    missing.append(row)
+                else:
+                    self._embedding_cache.move_to_end(key)
+                    embeddings[row] = cached
         
-        with open(metadata_file, 'wb') as f:
-            pickle.dump(self.metadata, f)
+        if not missing:
+            return embeddings
+        
+        embeddings[missing] = self.embedding_model.encode(
+            [queries[row] for row in missing],
+            batch_size=32,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        
+        with self._embedding_cache_lock:
+            for row in missing:
+                self._embedding_cache[keys[row]] = embeddings[row].copy()
+            while len(self._embedding_cache) > self.embedding_cache_size:
+                self._embedding_cache.popitem(last=False)
+        
+        return embeddings
+    
+    def _load_embedding_cache(self) -> "OrderedDict[bytes, np.ndarray]":
+        """Загрузка кэша embeddings с диска (если он от той же модели)"""
+        cache = OrderedDict()
+        cache_file = self.index_path / EMBEDDING_CACHE_FILE
+        
+        if not cache_file.exists():
+            return cache
+        
+        try:
+            with np.load(cache_file) as data:
+                if str(data['model']) != self._embedding_cache_tag:
+                    logger.info("Embedding cache belongs to another model, skipping")
+                    return cache
+                
+                for key, vector in zip(data['keys'], data['vectors']):
+                    cache[key.tobytes()] = vector
+            
+            # Оставляем только самые свежие записи
+            while len(cache) > self.embedding_cache_size:
+                cache.popitem(last=False)
+            
+            logger.info(f"Loaded {len(cache)} cached query embeddings")
+        except Exception as e:
+            logger.warning(f"Failed to load embedding cache: {e}")
+        
+        return cache
+    
+    def save_embedding_cache(self):
+        """Сохранение кэша embeddings (вызывается при shutdown)"""
+        with self._embedding_cache_lock:
+            if not self._embedding_cache:
+                return
+            
+            keys = np.frombuffer(
+                b''.join(self._embedding_cache.keys()),
+                dtype=np.uint8
+            ).reshape(-1, 16)
+            vectors = np.stack(list(self._embedding_cache.values()))
+        
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        
+        np.savez(
+            self.index_path / EMBEDDING_CACHE_FILE,
+            model=np.array(self._embedding_cache_tag),
+            keys=keys,
+            vectors=vectors
+        )
+        
+        logger.info(f"Embedding cache saved: {len(self._embedding_cache)} entries")
+    
+    def flush(self):
+        """Запись индекса на диск, если есть несохраненные добавления"""
+        if self._dirty_since_save:
+            self._save_index()
+    
+    def close(self):
+        """
+        Запись несохраненного индекса и закрытие SQLite
+
+        Снимает обработчик atexit, который иначе держит engine до
+        завершения процесса.
+        """
+        if self.mmap:
+            return
+        
+        atexit.unregister(self.flush)
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+    
+    def _save_index(self):
+        """Сохранение индекса (метаданные уже записаны в SQLite)"""
+        faiss.write_index(self.index, str(self.index_path / INDEX_FILE))
+        self._dirty_since_save = 0
         
         logger.info("FAISS index saved")
     
     def clear_index(self):
         """Очистка индекса"""
+        if self.mmap:
+            raise FAISSError("Index is opened read-only (mmap), clearing is disabled")
+        
         self.index.reset()
         self.metadata = []
+        self._db.execute("DELETE FROM metadata")
+        self._db.commit()
+        self._save_index()
         logger.info("FAISS index cleared")
@@ -1,13 +1,70 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import pdfplumber
+import pymupdf
 from pathlib import Path
-from typing import Dict, Any, List
-import io
-from PIL import Image
+from typing import Dict, Any, List, Optional
 
 from ..utils.logging_config import get_logger
+from ..core.config import settings
 
 logger = get_logger(__name__)
 
+# Форматы, которые сохраняются как есть (поддерживаются Vision API)
+VISION_IMAGE_EXTS = {'png', 'jpeg', 'jpg', 'webp'}
+
+# Пул процессов для таблиц (создается при первом большом документе);
+# больше процессов, чем ядер, только замедляет
+_TABLE_POOL_SIZE = min(settings.PDF_TABLE_WORKERS, os.cpu_count() or 1)
+_TABLE_POOL: Optional[ProcessPoolExecutor] = None
+_TABLE_POOL_LOCK = threading.Lock()
+
+
+def _get_table_pool() -> ProcessPoolExecutor:
+    """Общий пул процессов для извлечения таблиц"""
+    global _TABLE_POOL
+    
+    with _TABLE_POOL_LOCK:
+        if _TABLE_POOL is None:
+            # forkserver: fork многопоточного процесса (uvicorn) небезопасен
+            _TABLE_POOL = ProcessPoolExecutor(
+                max_workers=_TABLE_POOL_SIZE,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+    
+    return _TABLE_POOL
+
+
+def _extract_tables_from_pages(
+    pdf_path: Path,
+    page_indices: List[int]
+) -> List[Dict[str, Any]]:
+    """Таблицы с заданных страниц (0-based); выполняется и в воркерах пула"""
+    tables = []
+    
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_idx in page_indices:
+            for table in pdf.pages[page_idx].extract_tables():
+                if table:
+                    tables.append({
+                        'page': page_idx + 1,
+                        'data': table
+                    })
+    
+    return tables
+
+
+def _content_digest(pdf_path: Path) -> str:
+    """Хэш содержимого файла (имя папки изображений документа)"""
+    with open(pdf_path, 'rb') as f:
+        return hashlib.file_digest(
+            f,
+            lambda: hashlib.blake2b(digest_size=16)
+        ).hexdigest()
+
 
 class PDFParser:
     """
@@ -20,12 +77,33 @@ class PDFParser:
     - Metadata
     """
     
-    def parse(self, pdf_path: Path) -> Dict[str, Any]:
+    def __init__(self, img_dir: Path = Path("/tmp/pdf_images")):
+        """
+        Args:
+            img_dir: Папка для извлеченных изображений (по подпапке на PDF)
+        """
+        self._img_dir = Path(img_dir)
+        self._img_dir.mkdir(parents=True, exist_ok=True)
+    
+    def parse(
+        self,
+        pdf_path: Path,
+        *,
+        extract_tables: bool = True,
+        content_digest: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Парсинг PDF файла
         
+        Текст и изображения извлекаются через PyMuPDF, таблицы - через
+        pdfplumber (только со страниц, где есть векторная графика:
+        без линий table finder pdfplumber ничего не находит).
+        
         Args:
             pdf_path: Путь к PDF
+            extract_tables: Извлекать таблицы
+            content_digest: Хэш содержимого PDF, если уже посчитан
+                (иначе считается здесь)
         
         Returns:
             Dict с текстом, таблицами, изображениями и метаданными
@@ -42,35 +120,38 @@ class PDFParser:
         }
         
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                result['num_pages'] = len(pdf.pages)
-                result['metadata'] = pdf.metadata
+            # Страницы-кандидаты на таблицы (0-based)
+            table_pages = []
+            
+            # Папка изображений по хэшу содержимого: повторная загрузка того
+            # же документа переиспользует папку, разные документы с одним
+            # именем файла не перезаписывают изображения друг друга
+            img_dir = self._img_dir / (content_digest or _content_digest(pdf_path))
+            img_dir.mkdir(exist_ok=True)
+            
+            with pymupdf.open(pdf_path) as doc:
+                result['num_pages'] = doc.page_count
+                result['metadata'] = doc.metadata
                 
                 all_text = []
                 
-                for page_num, page in enumerate(pdf.pages, 1):
+                for page_num, page in enumerate(doc, 1):
                     # Извлечение текста
-                    page_text = page.extract_text()
+                    page_text = page.get_text("text")
                     if page_text:
                         all_text.append(page_text)
                     
-                    # Извлечение таблиц
-                    tables = page.extract_tables()
-                    for table in tables:
-                        if table:
-                            result['tables'].append({
-                                'page': page_num,
-                                'data': table
-                            })
+                    if extract_tables and page.get_cdrawings():
+                        table_pages.append(page_num - 1)
                     
                     # Извлечение изображений
-                    for img_obj in page.images:
+                    for img_info in page.get_images(full=True):
                         try:
                             # Сохранение изображения
                             img_path = self._save_image(
-                                page,
-                                img_obj,
-                                pdf_path,
+                                doc,
+                                img_info[0],
+                                img_dir,
                                 page_num
                             )
                             result['images'].append(img_path)
@@ -78,12 +159,16 @@ class PDFParser:
                             logger.warning(f"Failed to extract image: {e}")
                 
                 result['text'] = '\n\n'.join(all_text)
-                
-                logger.info(
-                    f"✅ PDF parsed: {result['num_pages']} pages, "
-                    f"{len(result['tables'])} tables, "
-                    f"{len(result['images'])} images"
-                )
+            
+            # Извлечение таблиц
+            if table_pages:
+                result['tables'] = self._extract_tables(pdf_path, table_pages)
+            
+            logger.info(
+                f"✅ PDF parsed: {result['num_pages']} pages, "
+                f"{len(result['tables'])} tables, "
+                f"{len(result['images'])} images"
+            )
                 
         except Exception as e:
             logger.error(f"PDF parsing error: {e}", exc_info=True)
@@ -91,32 +176,62 @@ class PDFParser:
         
         return result
     
-    def _save_image(
+    def _extract_tables(
         self,
-        page,
-        img_obj: Dict,
         pdf_path: Path,
-        page_num: int
-    ) -> Path:
-        """Сохранение изображения из PDF"""
-        # Создание папки для изображений
-        img_dir = Path(f"/tmp/pdf_images/{pdf_path.stem}")
-        img_dir.mkdir(parents=True, exist_ok=True)
+        table_pages: List[int]
+    ) -> List[Dict[str, Any]]:
+        """
+        Извлечение таблиц pdfplumber со страниц-кандидатов
         
-        # Имя файла
-        img_filename = f"page_{page_num}_img_{img_obj['name']}.png"
-        img_path = img_dir / img_filename
+        pdfplumber (pdfminer) - чистый Python и держит GIL, поэтому на
+        больших документах страницы делятся между процессами пула.
+        """
+        workers = min(_TABLE_POOL_SIZE, len(table_pages))
+        if workers < 2 or len(table_pages) < settings.PDF_TABLE_PARALLEL_MIN_PAGES:
+            return _extract_tables_from_pages(pdf_path, table_pages)
+        
+        # Страницы через одну по воркерам: таблицы неравномерны по документу
+        chunks = [table_pages[i::workers] for i in range(workers)]
+        pool = _get_table_pool()
+        
+        tables = []
+        for chunk_tables in pool.map(
+            _extract_tables_from_pages,
+            [pdf_path] * workers,
+            chunks
+        ):
+            tables.extend(chunk_tables)
         
+        # Порядок страниц как при последовательном обходе (sort стабилен)
+        tables.sort(key=lambda table: table['page'])
+        return tables
+    
+    def _save_image(
+        self,
+        doc,
+        xref: int,
+        img_dir: Path,
+        page_num: int
+    ) -> Path:
+        """Сохранение изображения из PDF (исходные байты, без растеризации)"""
         # Извлечение и сохранение
         try:
-            # Получение изображения из страницы
-            bbox = (img_obj['x0'], img_obj['top'], img_obj['x1'], img_obj['bottom'])
-            cropped = page.crop(bbox)
+            # Поток изображения как есть (JPEG/PNG/...), расширение по формату
+            image = doc.extract_image(xref)
+            
+            if image['ext'] in VISION_IMAGE_EXTS:
+                img_path = img_dir / f"page_{page_num}_img_{xref}.{image['ext']}"
+                img_path.write_bytes(image['image'])
+                return img_path
             
-            # Сохранение как изображение
-            img = cropped.to_image(resolution=150)
-            img.save(img_path)
+            # JPX/JBIG2/... не принимаются Vision API: декодирование в PNG
+            pix = pymupdf.Pixmap(doc, xref)
+            if pix.colorspace and pix.colorspace.n > 3:
+                pix = pymupdf.Pixmap(pymupdf.csRGB, pix)  # CMYK -> RGB
             
+            img_path = img_dir / f"page_{page_num}_img_{xref}.png"
+            pix.save(img_path)
             return img_path
         except Exception as e:
             logger.warning(f"Image extraction failed: {e}")
@@ -1,9 +1,12 @@
 import base64
+import json
+import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+import aiofiles
 import anthropic
-from PIL import Image
-import io
+import orjson
 from ..models.kpi_models import ChartAnalysis
 from ..utils.retry_handler import retry_with_backoff
 from ..utils.logging_config import get_logger
@@ -11,37 +14,88 @@ from ..core.config import settings
 
 logger = get_logger(__name__)
 
+_JSON_DECODER = json.JSONDecoder()
+
+# Ограничения Vision API на изображения
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+
+
+def _sniff_media_type(data: memoryview) -> Optional[str]:
+    """MIME-тип поддерживаемого формата (PNG/JPEG/WEBP) по сигнатуре"""
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return "image/png"
+    if data[:3] == b'\xff\xd8\xff':
+        return "image/jpeg"
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return "image/webp"
+    return None
+
+
+@lru_cache(maxsize=32)
+def _build_analysis_prompt(context: Optional[str]) -> str:
+    """Построение промпта для анализа (одинаков для одного context)"""
+    base_prompt = """Проанализируй этот финансовый график/диаграмму.
+
+Извлеки следующую информацию:
+1. Тип графика (линейный, столбчатый, круговая диаграмма)
+2. Название/заголовок (если есть)
+3. Ключевые значения (цифры, проценты)
+4. Тренды (рост, падение, стабильность)
+
+Верни результат в JSON формате:
+{
+    "chart_type": "line/bar/pie",
+    "title": "название",
+    "extracted_values": {"метрика": значение},
+    "trends": ["тренд1", "тренд2"],
+    "confidence": 0.0-1.0
+}"""
+    
+    if context:
+        base_prompt += f"\n\nКонтекст: {context}"
+    
+    return base_prompt
+
 
 class VisionAnalyzer:
     """Анализатор графиков через Claude Vision"""
     
     def __init__(self):
-        self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
         self.fallback_enabled = settings.VISION_FALLBACK_ENABLED
         
-    def _encode_image(self, image_path: Path) -> str:
-        """Кодирование изображения в base64"""
-        with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
-    
-    def _validate_image(self, image_path: Path) -> bool:
-        """Валидация изображения"""
+    async def _prepare_image(self, image_path: Path) -> Optional[Tuple[str, str]]:
+        """
+        Валидация и кодирование изображения за одно чтение файла
+        
+        Returns:
+            (base64 данные, MIME-тип) или None, если изображение невалидно
+        """
         try:
-            # Проверка размера (макс 5MB)
-            if image_path.stat().st_size > 5 * 1024 * 1024:
-                logger.warning(f"Image too large: {image_path}")
-                return False
+            async with aiofiles.open(image_path, 'rb') as f:
+                # Размер по fstat открытого файла: больше лимита не читаем
+                size = os.fstat(f.fileno()).st_size
+                if size > MAX_IMAGE_SIZE:
+                    logger.warning(f"Image too large: {image_path}")
+                    return None
+                
+                # Один readinto в буфер размера файла, без промежуточного bytes
+                buf = bytearray(size)
+                size = await f.readinto(buf)
             
-            # Проверка формата
-            img = Image.open(image_path)
-            if img.format not in ['PNG', 'JPEG', 'JPG', 'WEBP']:
-                logger.warning(f"Unsupported format: {img.format}")
-                return False
+            data = memoryview(buf)[:size]
             
-            return True
+            # Проверка формата по сигнатуре файла
+            media_type = _sniff_media_type(data)
+            if media_type is None:
+                logger.warning(f"Unsupported format: {image_path}")
+                return None
+            
+            # base64 - чистый ASCII, UTF-8 валидация не нужна
+            return base64.b64encode(data).decode('ascii'), media_type
         except Exception as e:
             logger.error(f"Image validation failed: {e}")
-            return False
+            return None
     
     @retry_with_backoff(max_retries=3, base_delay=1.0)
     async def analyze_chart(
@@ -57,25 +111,25 @@ class VisionAnalyzer:
             context: Дополнительный контекст (название отчета и т.д.)
         
         Returns:
-            ChartAnalysis с извлеченными данными
+            ChartAnalysis с извлеченными данными (или fallback-заглушка
+            с chart_type="unknown", если API недоступен)
         
         Raises:
             ValueError: Если изображение невалидно
-            VisionAPIError: Если API недоступен
+            VisionAPIError: Если API недоступен и fallback отключен
         """
         try:
-            # Валидация
-            if not self._validate_image(image_path):
+            # Валидация и кодирование
+            prepared = await self._prepare_image(image_path)
+            if prepared is None:
                 raise ValueError(f"Invalid image: {image_path}")
-            
-            # Кодирование
-            image_data = self._encode_image(image_path)
+            image_data, media_type = prepared
             
             # Prompt для анализа
-            prompt = self._build_analysis_prompt(context)
+            prompt = _build_analysis_prompt(context)
             
-            # Вызов Claude Vision
-            response = self.client.messages.create(
+            # Вызов Claude Vision (не блокирует event loop)
+            response = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=2048,
                 messages=[{
@@ -85,7 +139,7 @@ class VisionAnalyzer:
                             "type": "image",
                             "source": {
                                 "type": "base64",
-                                "media_type": "image/png",
+                                "media_type": media_type,
                                 "data": image_data
                             }
                         },
@@ -106,48 +160,25 @@ class VisionAnalyzer:
         except anthropic.APIError as e:
             logger.error(f"Vision API error: {e}")
             
-            # Graceful degradation
+            # Graceful degradation (single-call guarantee: вызывающему
+            # коду не нужно повторять запрос ради fallback)
             if self.fallback_enabled:
                 logger.info("Using fallback analysis")
                 return self._fallback_analysis(image_path)
             
             raise VisionAPIError(f"Vision API unavailable: {e}")
     
-    def _build_analysis_prompt(self, context: Optional[str]) -> str:
-        """Построение промпта для анализа"""
-        base_prompt = """Проанализируй этот финансовый график/диаграмму.
-
-Извлеки следующую информацию:
-1. Тип графика (линейный, столбчатый, круговая диаграмма)
-2. Название/заголовок (если есть)
-3. Ключевые значения (цифры, проценты)
-4. Тренды (рост, падение, стабильность)
-
-Верни результат в JSON формате:
-{
-    "chart_type": "line/bar/pie",
-    "title": "название",
-    "extracted_values": {"метрика": значение},
-    "trends": ["тренд1", "тренд2"],
-    "confidence": 0.0-1.0
-}"""
-        
-        if context:
-            base_prompt += f"\n\nКонтекст: {context}"
-        
-        return base_prompt
-    
     def _parse_vision_response(self, text: str) -> ChartAnalysis:
         """Парсинг ответа от Vision API"""
-        import json
-        
         # Извлечение JSON из ответа
         try:
-            # Попытка найти JSON блок
+            # Первый JSON-объект целиком, хвост ответа не сканируется
             start = text.find('{')
-            end = text.rfind('}') + 1
-            json_str = text[start:end]
-            data = json.loads(json_str)
+            try:
+                data, _ = _JSON_DECODER.raw_decode(text, max(start, 0))
+            except json.JSONDecodeError:
+                # Запасной вариант: от первой до последней скобки
+                data = orjson.loads(text[start:text.rfind('}') + 1])
             
             return ChartAnalysis(**data)
         except json.JSONDecodeError:
@@ -47,8 +47,9 @@ def setup_logging(log_level: Optional[str] = None) -> None:
             format="{message}",
             level=level,
             serialize=True,  # JSON output
-            backtrace=True,
-            diagnose=settings.DEBUG
+            colorize=False,
+            backtrace=False,
+            diagnose=False
         )
     else:
         # Human-readable для development
@@ -57,11 +58,12 @@ def setup_logging(log_level: Optional[str] = None) -> None:
             format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
             level=level,
             colorize=True,
-            backtrace=True,
-            diagnose=settings.DEBUG
+            backtrace=False,
+            diagnose=False
         )
     
-    # File handler для errors
+    # File handler для errors: расширенные трейсбеки (backtrace/diagnose)
+    # только здесь, консольные handlers их не собирают
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
     
@@ -1,6 +1,7 @@
 import asyncio
 import functools
 import random
+import time
 from typing import Callable, TypeVar, Any
 from ..utils.logging_config import get_logger
 
@@ -8,6 +9,17 @@ logger = get_logger(__name__)
 
 T = TypeVar('T')
 
+_rand = random.random
+
+
+def _with_jitter(delay: float) -> float:
+    """Случайный jitter: задержка * [0.5, 1.5)"""
+    return delay * (0.5 + _rand())
+
+
+def _without_jitter(delay: float) -> float:
+    return delay
+
 
 def retry_with_backoff(
     max_retries: int = 3,
@@ -34,78 +46,63 @@ def retry_with_backoff(
             return await client.call()
     """
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        # Задержки перед повторами (без jitter) вычисляются один раз;
+        # последняя попытка выполняется вне цикла, без проверки номера
+        _delays = tuple(
+            min(base_delay * (exponential_base ** attempt), max_delay)
+            for attempt in range(max_retries - 1)
+        )
+        _apply_jitter = _with_jitter if jitter else _without_jitter
+        
         @functools.wraps(func)
         async def async_wrapper(*args: Any, **kwargs: Any) -> T:
-            last_exception = None
-            
-            for attempt in range(max_retries):
+            for attempt, delay in enumerate(_delays, 1):
                 try:
                     return await func(*args, **kwargs)
                     
                 except exceptions as e:
-                    last_exception = e
-                    
-                    if attempt == max_retries - 1:
-                        logger.error(
-                            f"All {max_retries} retries failed for {func.__name__}",
-                            exc_info=True
-                        )
-                        raise
-                    
-                    # Вычисление задержки
-                    delay = min(
-                        base_delay * (exponential_base ** attempt),
-                        max_delay
-                    )
-                    
-                    # Добавление jitter
-                    if jitter:
-                        delay *= (0.5 + random.random())
+                    delay = _apply_jitter(delay)
                     
                     logger.warning(
-                        f"Attempt {attempt + 1}/{max_retries} failed for {func.__name__}. "
+                        f"Attempt {attempt}/{max_retries} failed for {func.__name__}. "
                         f"Retrying in {delay:.2f}s. Error: {str(e)}"
                     )
                     
                     await asyncio.sleep(delay)
             
-            raise last_exception
+            try:
+                return await func(*args, **kwargs)
+            except exceptions:
+                logger.error(
+                    f"All {max_retries} retries failed for {func.__name__}",
+                    exc_info=True
+                )
+                raise
         
         @functools.wraps(func)
         def sync_wrapper(*args: Any, **kwargs: Any) -> T:
-            last_exception = None
-            
-            for attempt in range(max_retries):
+            for attempt, delay in enumerate(_delays, 1):
                 try:
                     return func(*args, **kwargs)
                     
                 except exceptions as e:
-                    last_exception = e
-                    
-                    if attempt == max_retries - 1:
-                        logger.error(
-                            f"All {max_retries} retries failed for {func.__name__}",
-                            exc_info=True
-                        )
-                        raise
-                    
-                    delay = min(
-                        base_delay * (exponential_base ** attempt),
-                        max_delay
-                    )
-                    
-                    if jitter:
-                        delay *= (0.5 + random.random())
+                    delay = _apply_jitter(delay)
                     
                     logger.warning(
-                        f"Attempt {attempt + 1}/{max_retries} failed. "
+                        f"Attempt {attempt}/{max_retries} failed. "
                         f"Retrying in {delay:.2f}s. Error: {str(e)}"
                     )
                     
-                    import time
                     time.sleep(delay)
             
-            raise last_exception
+            try:
+                return func(*args, **kwargs)
+            except exceptions:
+                logger.error(
+                    f"All {max_retries} retries failed for {func.__name__}",
+                    exc_info=True
+                )
+                raise
         
         # Определение async или sync
         if asyncio.iscoroutinefunction(func):
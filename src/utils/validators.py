@@ -1,12 +1,81 @@
+import os
 import re
+import threading
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, List
-import bleach
+import ahocorasick
+from bleach.sanitizer import Cleaner
 from ..core.exceptions import ValidationError
 from ..utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# SQL injection: ключевые слова ищутся автоматом Aho-Corasick за один
+# линейный проход по тексту (значение слова - его длина)
+_SQL_KEYWORDS = (
+    "select", "insert", "update", "delete", "drop", "create", "alter", "union"
+)
+_SQL_KEYWORDS_AC = ahocorasick.Automaton()
+for _keyword in _SQL_KEYWORDS:
+    _SQL_KEYWORDS_AC.add_word(_keyword, len(_keyword))
+_SQL_KEYWORDS_AC.make_automaton()
+
+# Остальное (комментарии, OR-равенство) - регулярным выражением по тексту
+# в нижнем регистре. OR-равенство - как прежнее "\bor\b.*=", но в пределах
+# строки и не дальше 64 символов до "=" (без катастрофического backtracking)
+_SQLI_RE = re.compile(r"--|#|/\*|\*/|\bor\b[^=\n]{0,64}=")
+
+# Литералы, без которых _SQLI_RE не может совпасть: обычный текст
+# отсекается поиском подстрок (str.__contains__), без запуска regex
+_SQLI_MARKERS = ("--", "#", "/*", "*/")
+
+# Символы, удаляемые при экранировании SQL input
+_SQL_DELETE = str.maketrans("", "", ";")
+
+_COMPANY_NAME_RE = re.compile(r'^[а-яА-ЯёЁa-zA-Z0-9\s\-"\'\.]+$')
+
+
+# Cleaner создается один раз на поток: bleach.clean строит его на каждый
+# вызов, а сам Cleaner не потокобезопасен (HTML parser хранит состояние)
+_CLEANERS = threading.local()
+
+
+def _get_cleaner() -> Cleaner:
+    cleaner = getattr(_CLEANERS, 'cleaner', None)
+    if cleaner is None:
+        cleaner = _CLEANERS.cleaner = Cleaner(tags=[], strip=True)
+    return cleaner
+
+
+@lru_cache(maxsize=4096)
+def _clean(text: str) -> str:
+    """Очистка от HTML (чистая функция, результат кэшируется)"""
+    return _get_cleaner().clean(text)
+
+
+def _has_sql_keyword(low: str) -> bool:
+    """Есть ли в тексте (нижний регистр) SQL ключевое слово целым словом"""
+    last = len(low) - 1
+    for end, length in _SQL_KEYWORDS_AC.iter(low):
+        start = end - length + 1
+        # Граница слова как у \b: соседние символы не буквы/цифры/_
+        if start > 0 and (low[start - 1].isalnum() or low[start - 1] == '_'):
+            continue
+        if end < last and (low[end + 1].isalnum() or low[end + 1] == '_'):
+            continue
+        return True
+    return False
+
+
+def _may_match_sqli_re(low: str) -> bool:
+    """Быстрая проверка: может ли _SQLI_RE совпасть (OR-равенству нужны "or" и "=")"""
+    for marker in _SQLI_MARKERS:
+        if marker in low:
+            return True
+    return "=" in low and "or" in low
+
 
 class InputValidator:
     """Валидация и санитизация входных данных"""
@@ -15,13 +84,12 @@ class InputValidator:
     ALLOWED_EXTENSIONS = {'.pdf', '.xlsx', '.xls', '.csv'}
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
     
-    # SQL injection patterns
-    SQL_INJECTION_PATTERNS = [
-        r"(\b(SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER)\b)",
-        r"(--|#|\/\*|\*\/)",
-        r"(\bOR\b.*=.*)",
-        r"(\bUNION\b.*\bSELECT\b)",
-    ]
+    # Сигнатуры (magic bytes) по расширению; у CSV сигнатуры нет
+    FILE_SIGNATURES = {
+        '.pdf': b'%PDF',
+        '.xlsx': b'PK\x03\x04',  # ZIP (OOXML)
+        '.xls': b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',  # OLE2
+    }
     
     @classmethod
     def validate_file_upload(cls, file_path: Path) -> bool:
@@ -37,39 +105,61 @@ class InputValidator:
         Raises:
             ValidationError: Если файл невалиден
         """
-        # Проверка существования
-        if not file_path.exists():
+        # Один stat: существование и размер
+        try:
+            file_size = file_path.stat().st_size
+        except (FileNotFoundError, NotADirectoryError):
             raise ValidationError(f"File not found: {file_path}")
         
         # Проверка расширения
-        if file_path.suffix.lower() not in cls.ALLOWED_EXTENSIONS:
+        # splitext по строке пути (os.fspath кэшируется), без разбора PurePath
+        suffix = os.path.splitext(file_path)[1]
+        suffix_lower = suffix.lower()
+        if suffix_lower not in cls.ALLOWED_EXTENSIONS:
             raise ValidationError(
-                f"Invalid file extension: {file_path.suffix}. "
+                f"Invalid file extension: {suffix}. "
                 f"Allowed: {cls.ALLOWED_EXTENSIONS}"
             )
         
         # Проверка размера
-        file_size = file_path.stat().st_size
         if file_size > cls.MAX_FILE_SIZE:
             raise ValidationError(
                 f"File too large: {file_size / 1024 / 1024:.2f}MB. "
                 f"Max: {cls.MAX_FILE_SIZE / 1024 / 1024}MB"
             )
         
-        # Проверка на исполняемые файлы (по magic bytes)
-        if cls._is_executable(file_path):
+        # Проверка содержимого по magic bytes: сигнатура формата исключает
+        # и исполняемые файлы; CSV проверяется только на MZ/ELF
+        signature = cls.FILE_SIGNATURES.get(suffix_lower)
+        if signature is not None:
+            if cls._read_header(file_path, len(signature)) != signature:
+                raise ValidationError(
+                    f"File content does not match extension: {suffix}"
+                )
+        elif file_size >= 2 and cls._is_executable(file_path):
             raise ValidationError("Executable files are not allowed")
         
-        logger.info(f"File validated successfully: {file_path}")
+        # Аргумент форматируется только если DEBUG включен
+        logger.debug("File validated successfully: {}", file_path)
         return True
     
     @staticmethod
-    def _is_executable(file_path: Path) -> bool:
+    def _read_header(file_path: Path, size: int) -> bytes:
+        """Первые size байт файла"""
+        # Сырой дескриптор: без буфера io.BufferedReader на несколько байт
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            return os.pread(fd, size, 0)
+        finally:
+            os.close(fd)
+    
+    @classmethod
+    def _is_executable(cls, file_path: Path) -> bool:
         """Проверка на исполняемый файл"""
-        with open(file_path, 'rb') as f:
-            header = f.read(4)
-            # EXE, DLL, etc.
-            return header[:2] == b'MZ' or header == b'\x7fELF'
+        header = cls._read_header(file_path, 4)
+        
+        # EXE, DLL, etc.
+        return header[:2] == b'MZ' or header == b'\x7fELF'
     
     @classmethod
     def sanitize_sql_input(cls, text: str) -> str:
@@ -83,25 +173,20 @@ class InputValidator:
             Безопасный текст
         """
         # Проверка на SQL injection паттерны
-        for pattern in cls.SQL_INJECTION_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                logger.warning(f"Potential SQL injection detected: {text[:100]}")
-                raise ValidationError("Invalid input: SQL injection detected")
+        low = text.lower()
+        if _has_sql_keyword(low) or (
+            _may_match_sqli_re(low) and _SQLI_RE.search(low)
+        ):
+            logger.warning(f"Potential SQL injection detected: {text[:100]}")
+            raise ValidationError("Invalid input: SQL injection detected")
         
         # Экранирование спецсимволов
-        sanitized = text.replace("'", "''")
-        sanitized = sanitized.replace(";", "")
-        
-        return sanitized
+        return text.translate(_SQL_DELETE).replace("'", "''")
     
     @staticmethod
     def sanitize_html(text: str) -> str:
         """Очистка от HTML/XSS"""
-        return bleach.clean(
-            text,
-            tags=[],
-            strip=True
-        )
+        return _clean(text)
     
     @classmethod
     def validate_company_name(cls, name: str) -> str:
@@ -116,16 +201,38 @@ class InputValidator:
         sanitized = cls.sanitize_html(name)
         
         # Проверка на допустимые символы
-        if not re.match(r'^[а-яА-ЯёЁa-zA-Z0-9\s\-"\'\.]+$', sanitized):
+        if not _COMPANY_NAME_RE.match(sanitized):
             raise ValidationError("Company name contains invalid characters")
         
         return sanitized
     
+    @classmethod
+    def validate_company_names_batch(cls, names: List[str]) -> List[str]:
+        """
+        Валидация списка названий компаний
+        
+        Повторяющиеся названия проверяются один раз.
+        
+        Raises:
+            ValidationError: На первом невалидном названии (с его индексом)
+        """
+        validated = {}
+        result = []
+        
+        for i, name in enumerate(names):
+            sanitized = validated.get(name)
+            if sanitized is None:
+                try:
+                    sanitized = validated[name] = cls.validate_company_name(name)
+                except ValidationError as e:
+                    raise ValidationError(f"Company name #{i}: {e}") from e
+            result.append(sanitized)
+        
+        return result
+    
     @staticmethod
     def validate_date_range(start_date: str, end_date: str) -> bool:
         """Валидация диапазона дат"""
-        from datetime import datetime
-        
         try:
             start = datetime.fromisoformat(start_date)
             end = datetime.fromisoformat(end_date)
@@ -32,13 +32,13 @@ def temp_dir() -> Generator[Path, None, None]:
     shutil.rmtree(temp_path)
 
 
-@pytest.fixture
-def sample_pdf_path(temp_dir: Path) -> Path:
-    """Путь к тестовому PDF"""
+@pytest.fixture(scope="session")
+def sample_pdf_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Путь к тестовому PDF (генерируется один раз на сессию, только чтение)"""
     # Создание простого тестового PDF
     from reportlab.pdfgen import canvas
     
-    pdf_path = temp_dir / "test_report.pdf"
+    pdf_path = tmp_path_factory.mktemp("pdf") / "test_report.pdf"
     c = canvas.Canvas(str(pdf_path))
     
     # Добавление текста
@@ -0,0 +1,76 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.tools.calculator import FinancialCalculator
+
+
+# Значения по двум периодам; покрывают входы всех метрик
+VALUES = {
+    'current_assets': [600000.0, 450000.0],
+    'current_liabilities': [300000.0, 500000.0],
+    'inventory': [100000.0, 50000.0],
+    'net_income': [120000.0, -30000.0],
+    'equity': [500000.0, 400000.0],
+    'total_assets': [1000000.0, 900000.0],
+    'total_debt': [250000.0, 300000.0],
+    'revenue': [2000000.0, 1500000.0],
+    'gross_profit': [800000.0, 600000.0],
+    'operating_income': [300000.0, 100000.0],
+}
+
+
+class TestFinancialCalculator:
+    """Unit tests для FinancialCalculator"""
+    
+    @pytest.fixture
+    def calculator(self) -> FinancialCalculator:
+        return FinancialCalculator()
+    
+    @pytest.mark.parametrize("metric", sorted(FinancialCalculator.SUPPORTED_METRICS))
+    def test_calculate_batch_matches_scalar(self, calculator, metric):
+        """Батч совпадает с поэлементным calculate"""
+        batch = calculator.calculate_batch(metric, VALUES)
+        
+        for i in range(2):
+            scalar = calculator.calculate(
+                metric,
+                {key: values[i] for key, values in VALUES.items()}
+            )
+            assert batch[i] == pytest.approx(scalar, rel=1e-12)
+    
+    def test_calculate_batch_zero_denominator(self, calculator):
+        """Нулевой знаменатель дает inf/nan в позиции, а не исключение"""
+        result = calculator.calculate_batch(
+            'current_ratio',
+            {
+                'current_assets': np.array([600000.0, 100.0, 0.0]),
+                'current_liabilities': np.array([300000.0, 0.0, 0.0])
+            }
+        )
+        
+        assert result[0] == pytest.approx(2.0)
+        assert math.isinf(result[1])
+        assert math.isnan(result[2])
+        
+        with pytest.raises(ValueError, match="Division by zero"):
+            calculator.calculate(
+                'current_ratio',
+                {'current_assets': 100.0, 'current_liabilities': 0.0}
+            )
+    
+    def test_calculate_batch_unsupported_metric(self, calculator):
+        """Ошибка при неизвестной метрике"""
+        with pytest.raises(ValueError, match="Unsupported metric"):
+            calculator.calculate_batch('ebitda_margin', VALUES)
+        
+        with pytest.raises(ValueError) as exc_info:
+            calculator.calculate('ebitda_margin', {})
+        supported = ', '.join(sorted(FinancialCalculator.SUPPORTED_METRICS))
+        assert str(exc_info.value).endswith(f"Supported: {supported}")
+    
+    def test_calculate_batch_missing_value(self, calculator):
+        """Ошибка при отсутствии нужного массива"""
+        with pytest.raises(ValueError, match="Missing required value"):
+            calculator.calculate_batch('roe', {'net_income': [1.0]})
@@ -0,0 +1,142 @@
+import hashlib
+import pickle
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.core.config import settings
+from src.tools import faiss_search
+from src.tools.faiss_search import FAISSSearchEngine
+
+
+class FakeEncoder:
+    """Детерминированный encoder: нормализованный случайный вектор по тексту"""
+    
+    DIM = 64
+    
+    def __init__(self, *args, **kwargs):
+        pass
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.DIM
+    
+    def eval(self):
+        return self
+    
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        vectors = np.stack([
+            np.random.default_rng(
+                int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little')
+            ).standard_normal(self.DIM)
+            for text in texts
+        ]).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def make_engine(monkeypatch, temp_dir):
+    """Фабрика FAISSSearchEngine с fake encoder во временной папке"""
+    monkeypatch.setattr(faiss_search, "SentenceTransformer", FakeEncoder)
+    monkeypatch.setattr(faiss_search, "_MODEL_CACHE", {})
+    
+    engines = []
+    
+    def make(index_path=temp_dir, **kwargs) -> FAISSSearchEngine:
+        engine = FAISSSearchEngine(index_path=index_path, **kwargs)
+        engines.append(engine)
+        return engine
+    
+    yield make
+    
+    for engine in engines:
+        engine.close()
+
+
+def _docs(start: int, count: int):
+    return [
+        {'text': f"Отчет {i}", 'metadata': {'doc': i}}
+        for i in range(start, start + count)
+    ]
+
+
+class TestFAISSSearchEngine:
+    """Unit tests для FAISSSearchEngine"""
+    
+    def test_sq8_trained_on_accumulated_vectors(self, make_engine, monkeypatch):
+        """SQ8 обучается на всех накопленных векторах, а не на первом батче"""
+        monkeypatch.setattr(settings, "FAISS_INDEX_TYPE", "sq8")
+        monkeypatch.setattr(settings, "FAISS_SQ_TRAIN_SIZE", 500)
+        engine = make_engine()
+        
+        engine.add_documents(_docs(0, 1))
+        engine.add_documents(_docs(1, 700))
+        
+        assert isinstance(engine.index, faiss_search.faiss.IndexScalarQuantizer)
+        for i in (0, 350, 700):
+            top = engine.search(f"Отчет {i}", top_k=1)[0]
+            assert top['index'] == i
+            assert top['metadata'] == {'doc': i}
+            assert top['score'] == pytest.approx(1.0, abs=0.02)
+    
+    def test_metadata_round_trip(self, make_engine, temp_dir):
+        """Метаданные переживают close() и читаются read-only engine"""
+        # '#', '?' и '%' в пути не должны ломать read-only SQLite URI
+        index_path = temp_dir / "idx #1?%"
+        engine = make_engine(index_path=index_path)
+        docs = _docs(0, 3)
+        docs[1]['metadata'] = {'company': "ООО Пример", 'values': [1.5, None]}
+        engine.add_documents(docs)
+        engine.close()
+        
+        for reopened in (
+            make_engine(index_path=index_path),
+            make_engine(index_path=index_path, mmap=True)
+        ):
+            assert reopened.index.ntotal == 3
+            assert reopened.metadata == [doc['metadata'] for doc in docs]
+            top = reopened.search("Отчет 1", top_k=1)[0]
+            assert top['index'] == 1
+            assert top['metadata'] == docs[1]['metadata']
+    
+    def test_metadata_truncated_to_saved_index(self, make_engine, temp_dir):
+        """Строки SQLite сверх сохраненного индекса отбрасываются"""
+        engine = make_engine()
+        engine.add_documents(_docs(0, 3))
+        engine.close()
+        saved_index = (temp_dir / faiss_search.INDEX_FILE).read_bytes()
+        
+        # Процесс дописал метаданные, но индекс на диске остался старым
+        engine = make_engine()
+        engine.add_documents(_docs(3, 2))
+        engine.close()
+        (temp_dir / faiss_search.INDEX_FILE).write_bytes(saved_index)
+        
+        engine = make_engine()
+        assert engine.index.ntotal == 3
+        assert engine.metadata == [{'doc': i} for i in range(3)]
+        
+        engine.add_documents(_docs(3, 1))
+        engine.close()
+        with sqlite3.connect(temp_dir / faiss_search.METADATA_DB_FILE) as db:
+            assert db.execute("SELECT COUNT(*) FROM metadata").fetchone() == (4,)
+        assert make_engine().metadata == [{'doc': i} for i in range(4)]
+    
+    def test_legacy_metadata_migrated(self, make_engine, temp_dir):
+        """metadata.pkl переносится в SQLite при первом открытии"""
+        engine = make_engine()
+        engine.add_documents(_docs(0, 2))
+        engine.close()
+        
+        legacy = [{'company': "ООО Пример"}, {'company': "АО Тест"}]
+        (temp_dir / faiss_search.METADATA_DB_FILE).unlink()
+        with open(temp_dir / faiss_search.LEGACY_METADATA_FILE, 'wb') as f:
+            pickle.dump(legacy, f)
+        
+        engine = make_engine()
+        assert engine.metadata == legacy
+        engine.close()
+        
+        with sqlite3.connect(temp_dir / faiss_search.METADATA_DB_FILE) as db:
+            assert db.execute("SELECT COUNT(*) FROM metadata").fetchone() == (2,)
+        assert make_engine(mmap=True).metadata == legacy
@@ -1,7 +1,10 @@
+import math
+
 import pytest
 from datetime import date
 from decimal import Decimal
 
+from src.models._kpi_fastpath import RATIO_NAMES, balance_sheet_ratios
 from src.models.kpi_models import (
     FinancialMetric,
     BalanceSheetKPI,
@@ -9,6 +12,22 @@ from src.models.kpi_models import (
 )
 
 
+def _balance(assets, liabilities, equity, current_assets=None, current_liabilities=None):
+    """BalanceSheetKPI из чисел (None - метрики нет)"""
+    def metric(name, value):
+        if value is None:
+            return None
+        return FinancialMetric(name=name, value=Decimal(value), period=date(2024, 12, 31))
+    
+    return BalanceSheetKPI(
+        total_assets=metric("Активы", assets),
+        total_liabilities=metric("Пассивы", liabilities),
+        equity=metric("Капитал", equity),
+        current_assets=metric("Текущие активы", current_assets),
+        current_liabilities=metric("Текущие пассивы", current_liabilities)
+    )
+
+
 class TestFinancialMetric:
     """Unit tests для FinancialMetric"""
     
@@ -25,6 +44,17 @@ class TestFinancialMetric:
         assert metric.value == Decimal("1000000")
         assert metric.confidence == 1.0
     
+    def test_value_f_matches_decimal(self):
+        """float-представление значения не попадает в сериализацию"""
+        metric = FinancialMetric(
+            name="Активы",
+            value=Decimal("1234.5"),
+            period=date(2024, 12, 31)
+        )
+        
+        assert metric.value_f == 1234.5
+        assert "value_f" not in metric.model_dump()
+    
     def test_negative_value_validation(self):
         """Валидация отрицательных значений"""
         with pytest.raises(ValueError, match="не может быть отрицательной"):
@@ -69,3 +99,70 @@ class TestBalanceSheetKPI:
         )
         
         assert kpi.current_ratio == pytest.approx(2.0, rel=0.01)
+    
+    def test_ratios_zero_denominator(self):
+        """Коэффициенты с нулевым знаменателем не определены"""
+        kpi = BalanceSheetKPI(
+            total_assets=FinancialMetric(
+                name="Активы",
+                value=Decimal("1000000"),
+                period=date(2024, 12, 31)
+            ),
+            total_liabilities=FinancialMetric(
+                name="Пассивы",
+                value=Decimal("1000000"),
+                period=date(2024, 12, 31)
+            ),
+            equity=FinancialMetric(
+                name="Капитал",
+                value=Decimal("0"),
+                period=date(2024, 12, 31)
+            )
+        )
+        
+        assert kpi.ratios() == {
+            'current_ratio': None,
+            'debt_to_equity': None,
+            'equity_ratio': 0.0
+        }
+
+
+class TestBalanceSheetRatiosFastpath:
+    """Unit tests для _kpi_fastpath.balance_sheet_ratios"""
+    
+    def test_matches_ratios(self):
+        """Батч совпадает с BalanceSheetKPI.ratios() по каждому отчету"""
+        kpis = [
+            _balance("1000000", "500000", "500000", "600000", "300000"),
+            _balance("2500000.75", "1800000", "700000.75", "900000", "1200000"),
+            _balance("350", "100", "250", "120", "80"),
+        ]
+        
+        result = balance_sheet_ratios(kpis)
+        
+        assert result.shape == (len(kpis), len(RATIO_NAMES))
+        for row, kpi in zip(result, kpis):
+            expected = kpi.ratios()
+            for value, name in zip(row, RATIO_NAMES):
+                assert value == pytest.approx(expected[name], rel=1e-12)
+    
+    def test_undefined_ratios_are_nan(self):
+        """Нет метрики или нулевой знаменатель -> nan (в ratios() - None)"""
+        kpis = [
+            # нет текущих активов/пассивов
+            _balance("1000000", "1000000", "0"),
+            # нулевые текущие пассивы и активы
+            _balance("0", "100", "0", "600000", "0"),
+        ]
+        
+        result = balance_sheet_ratios(kpis)
+        
+        for row, kpi in zip(result, kpis):
+            expected = kpi.ratios()
+            for value, name in zip(row, RATIO_NAMES):
+                if expected[name] is None:
+                    assert math.isnan(value)
+                else:
+                    assert value == pytest.approx(expected[name])
+        assert all(math.isnan(value) for value in result[1])
+        assert result[0, 2] == 0.0
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.utils import retry_handler
+from src.utils.retry_handler import retry_with_backoff
+
+
+@pytest.fixture(autouse=True)
+def silent_logger(monkeypatch):
+    """Ошибки ретраев не пишутся в sink'и (в том числе logs/errors.log)"""
+    monkeypatch.setattr(retry_handler, "logger", MagicMock())
+
+
+class TestRetryWithBackoff:
+    """Unit tests для retry_with_backoff"""
+    
+    def test_async_retry_does_not_block_event_loop(self, monkeypatch):
+        """Async wrapper ждет через asyncio.sleep, а не time.sleep"""
+        def blocking_sleep(delay):
+            raise AssertionError("time.sleep called in async retry")
+        
+        monkeypatch.setattr(time, "sleep", blocking_sleep)
+        calls = []
+        
+        @retry_with_backoff(max_retries=3, base_delay=0.0, exceptions=(ValueError,))
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ValueError("temporary")
+            return "ok"
+        
+        assert asyncio.run(flaky()) == "ok"
+        assert len(calls) == 3
+    
+    def test_sync_retry_reraises_last_error(self, monkeypatch):
+        """Sync wrapper после всех попыток пробрасывает исключение"""
+        delays = []
+        monkeypatch.setattr(time, "sleep", delays.append)
+        
+        @retry_with_backoff(max_retries=3, base_delay=1.0, jitter=False, exceptions=(ValueError,))
+        def failing():
+            raise ValueError("permanent")
+        
+        with pytest.raises(ValueError, match="permanent"):
+            failing()
+        
+        assert delays == [1.0, 2.0]
@@ -24,13 +24,21 @@ class TestInputValidator:
         """Ошибка при превышении размера"""
         large_file = temp_dir / "large.pdf"
         
-        # Создание файла > 10MB
+        # Создание файла > 10MB (sparse: без записи данных)
         with open(large_file, 'wb') as f:
-            f.write(b'0' * (11 * 1024 * 1024))
+            f.truncate(11 * 1024 * 1024)
         
         with pytest.raises(ValidationError, match="File too large"):
             InputValidator.validate_file_upload(large_file)
     
+    def test_validate_file_upload_signature_mismatch(self, temp_dir):
+        """Ошибка, если содержимое не соответствует расширению"""
+        fake_pdf = temp_dir / "report.pdf"
+        fake_pdf.write_bytes(b'MZ\x90\x00')
+        
+        with pytest.raises(ValidationError, match="does not match extension"):
+            InputValidator.validate_file_upload(fake_pdf)
+    
     def test_sanitize_sql_input_valid(self):
         """Валидный SQL input"""
         text = "SELECT * FROM users WHERE id = 1"
@@ -45,6 +53,18 @@ class TestInputValidator:
         with pytest.raises(ValidationError, match="SQL injection"):
             InputValidator.sanitize_sql_input(malicious)
     
+    @pytest.mark.parametrize("malicious", [
+        "x' or (1=1)",
+        "admin' OR x.y=1",
+        "x OR -1=-1",
+        "x' OR 1.0=1.0",
+        "1 or 2>1 and a=b",
+    ])
+    def test_sanitize_sql_input_or_equality(self, malicious):
+        """OR-равенство с произвольным выражением перед '='"""
+        with pytest.raises(ValidationError, match="SQL injection"):
+            InputValidator.sanitize_sql_input(malicious)
+    
     def test_validate_company_name_success(self):
         """Валидное название компании"""
         name = "ООО Тестовая Компания"
@@ -59,3 +79,12 @@ class TestInputValidator:
         """Невалидные символы"""
         with pytest.raises(ValidationError, match="invalid characters"):
             InputValidator.validate_company_name("Test <script>")
+    
+    def test_validate_company_names_batch(self):
+        """Пакетная валидация: индекс невалидного названия в ошибке"""
+        names = ["ООО Тестовая Компания", "ООО Тестовая Компания", "А"]
+        
+        assert InputValidator.validate_company_names_batch(names[:2]) == names[:2]
+        
+        with pytest.raises(ValidationError, match="#2: Company name too short"):
+            InputValidator.validate_company_names_batch(names)